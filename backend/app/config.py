@@ -0,0 +1,180 @@
+import asyncio
+import os
+import signal
+from pathlib import Path
+from typing import Callable, Optional
+
+from dotenv import dotenv_values
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+# Fichier de configuration du backend (écrit par start.sh)
+ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+
+
+class Settings(BaseSettings):
+    """
+    Configuration du service LLM, lue une seule fois depuis backend/.env et l'environnement
+
+    Le fichier .env est prioritaire sur les variables d'environnement (docker-compose les
+    définit vides quand les clés ne sont présentes que dans backend/.env) et les valeurs
+    vides sont ignorées. Les modifications sont prises en compte par reload_settings().
+    """
+
+    model_config = SettingsConfigDict(
+        env_file=ENV_FILE,
+        env_file_encoding="utf-8",
+        env_ignore_empty=True,
+        extra="ignore",
+    )
+
+    # Providers
+    groq_api_key: Optional[str] = None
+    ai_gateway_api_key: Optional[str] = None
+    ollama_base_url: str = "http://ollama:11434"
+    ollama_api_key: str = "not-needed"
+
+    # Modèles (listes séparées par des virgules)
+    llm_models: Optional[str] = None
+    groq_models: Optional[str] = None
+    vercel_models: Optional[str] = None
+    ollama_models: Optional[str] = None
+
+    # Pool de connexions du client asynchrone
+    llm_max_connections: int = 20
+    llm_keepalive_seconds: float = 60.0
+
+    # Routage et secours
+    llm_ollama_fallback: bool = True
+    llm_rate_limit_max_wait: float = 5.0
+
+    # Limites de débit (0 = illimité, None = valeur par défaut du provider)
+    groq_rpm: Optional[int] = None
+    groq_tpm: Optional[int] = None
+    vercel_rpm: Optional[int] = None
+    vercel_tpm: Optional[int] = None
+    ollama_rpm: Optional[int] = None
+    ollama_tpm: Optional[int] = None
+    llm_rate_limits: Optional[str] = None
+
+    # Résumé hiérarchique
+    llm_chunk_tokens: int = 3000
+    llm_map_concurrency: int = 4
+
+    # Préchargement Ollama
+    ollama_warmup: str = "auto"
+    ollama_keep_alive: str = "30m"
+    ollama_warmup_interval: float = 240.0
+
+    @classmethod
+    def settings_customise_sources(
+        cls, settings_cls, init_settings, env_settings, dotenv_settings, file_secret_settings
+    ):
+        # backend/.env avant l'environnement : même comportement que load_dotenv(override=True)
+        return init_settings, dotenv_settings, env_settings, file_secret_settings
+
+
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """Retourne la configuration (chargée au premier appel uniquement)"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def reload_settings(on_change: Optional[Callable[[Settings], None]] = None) -> Settings:
+    """
+    Relit backend/.env et l'environnement
+
+    Args:
+        on_change: Appliquée à la nouvelle configuration ; en cas d'erreur, l'ancienne reste en place
+
+    Returns:
+        La nouvelle configuration, qui remplace l'ancienne
+    """
+    global _settings
+    settings = Settings()
+    if on_change is not None:
+        on_change(settings)
+    _settings = settings
+    return settings
+
+
+def load_process_env(path: Path = ENV_FILE):
+    """
+    Charge dans l'environnement les variables de backend/.env hors configuration LLM (réglages Whisper, ...)
+
+    Les clés de Settings restent hors de os.environ : elles sont relues depuis le fichier à
+    chaque rechargement, une clé supprimée de backend/.env disparaît donc de la configuration.
+    Les variables déjà définies dans l'environnement sont prioritaires.
+    """
+    managed = {name.upper() for name in Settings.model_fields}
+    for key, value in dotenv_values(path).items():
+        if value is not None and key.upper() not in managed and key not in os.environ:
+            os.environ[key] = value
+
+
+class ConfigWatcher:
+    """
+    Rechargement à chaud de la configuration
+
+    Surveille la date de modification de backend/.env (vérifiée toutes les
+    CONFIG_WATCH_INTERVAL secondes, 0 pour désactiver) et le signal SIGHUP
+    (kill -HUP <pid>) ; appelle on_change après chaque rechargement.
+    """
+
+    def __init__(self, on_change: Callable[[Settings], None], path: Path = ENV_FILE, interval: float = None):
+        self.on_change = on_change
+        self.path = path
+        self.interval = interval if interval is not None else float(os.getenv("CONFIG_WATCH_INTERVAL", "2"))
+        self._mtime = self._current_mtime()
+        self._task: Optional[asyncio.Task] = None
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload(self, reason: str):
+        print(f"🔄 Rechargement de la configuration ({reason})...")
+        try:
+            reload_settings(self.on_change)
+        except Exception as e:
+            # Configuration invalide : l'ancienne reste en place
+            print(f"⚠️ Configuration non rechargée: {e}")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            mtime = self._current_mtime()
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self.reload(f"{self.path.name} modifié")
+
+    def start(self):
+        """Démarre la surveillance (à appeler dans la boucle d'événements)"""
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload, "SIGHUP")
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass  # Windows : pas de SIGHUP
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Avant l'import des services : leurs réglages (WHISPER_VAD, SESSION_IDLE_TTL, ...) sont
+# lus à l'import de leurs modules
+load_process_env()
@@ -1,10 +1,9 @@
-from app.db.database import SessionLocal, init_db
+from app.db.database import SessionLocal
 from app.models.prompt import Prompt
 
 
 def seed_prompts():
-    """Crée 3 prompts par défaut si la table est vide"""
-    init_db()
+    """Crée 3 prompts par défaut si la table est vide (tables créées au préalable par init_db)"""
     db = SessionLocal()
 
     try:
@@ -1,32 +1,80 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import json
 import os
 import asyncio
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
-from dotenv import load_dotenv
 
+# Importé en premier : charge les variables de backend/.env lues à l'import des services
+from app.config import ConfigWatcher
 from app.db.database import init_db
 from app.db.seed import seed_prompts
-from app.routes import prompts, summary
+from app.routes import prompts, summary, transcriptions
 from app.services.whisper_service import WhisperService
+from app.services.readiness import ERROR, PENDING, readiness
+from app.services.session_registry import RecordingSession, session_registry
+from app.services.transcription_scheduler import TranscriptionScheduler
+from app.services.whisper_pool import WhisperProcessPool, pool_size
 
-# Charger les variables d'environnement
-load_dotenv()
+# Démarrage non bloquant (LAZY_STARTUP=1, défaut) : l'API répond immédiatement et le modèle
+# Whisper est chargé en tâche de fond ; LAZY_STARTUP=0 le charge avant de servir les requêtes
+LAZY_STARTUP = os.getenv("LAZY_STARTUP", "1") != "0"
+
+# Délai maximal d'attente du modèle par une session WebSocket avant la transcription finale
+MODEL_READY_TIMEOUT = float(os.getenv("MODEL_READY_TIMEOUT", "600"))
 
-# Initialiser la base de données et seed les prompts au démarrage
 print("🚀 Démarrage de l'application Minuta...")
-print("📦 Initialisation de la base de données...")
+readiness.register("database")
+readiness.register("whisper", steps=2)
+
+# Initialiser la base de données et seed les prompts (rapide : les routes CRUD en dépendent)
+readiness.step("database", "Initialisation de la base de données")
 init_db()
-print("🌱 Seed des prompts par défaut...")
 seed_prompts()
+readiness.ready("database")
+
+# Processus Whisper dédiés (WHISPER_PROCESSES, 0 = inférence dans le processus principal)
+WHISPER_PROCESSES = pool_size()
+
+# Nombre de transcriptions exécutées en parallèle
+TRANSCRIPTION_WORKERS = WHISPER_PROCESSES or 2
+
+# Service Whisper (singleton) - le modèle est chargé par load_whisper()
+whisper_service = WhisperService(concurrent_jobs=TRANSCRIPTION_WORKERS)
+
+# Service utilisé pour les transcriptions : pool de processus démarré après le chargement
+# du modèle (poids partagés par mmap), ou le service local
+asr_service = whisper_service
+
+# Planificateur des transcriptions (éviter de bloquer le WebSocket) : les finales passent
+# avant les partielles, regroupées en lots d'inférence entre toutes les sessions
+transcription_scheduler = TranscriptionScheduler(asr_service, workers=TRANSCRIPTION_WORKERS)
+
+
+def load_whisper():
+    """Charge le modèle Whisper puis démarre le pool de processus (étapes suivies par /ready)"""
+    global asr_service
+    try:
+        readiness.step("whisper", f"Chargement du modèle {whisper_service.model_size}", 0)
+        whisper_service.preload_model()
+        if WHISPER_PROCESSES > 0:
+            readiness.step("whisper", f"Démarrage de {WHISPER_PROCESSES} workers", 1)
+            try:
+                asr_service = WhisperProcessPool(whisper_service, WHISPER_PROCESSES)
+                transcription_scheduler.whisper_service = asr_service
+            except ValueError as e:
+                print(f"ATTENTION: {e}. Inférence dans le processus principal.")
+        readiness.ready("whisper")
+    except Exception as e:
+        readiness.fail("whisper", e)
+
 
-# Service Whisper (singleton) - créé avant l'app pour précharger le modèle
-whisper_service = WhisperService()
-print("🤖 Préchargement du modèle Whisper (cela peut prendre quelques instants)...")
-whisper_service.preload_model()
-print("✅ Application prête!")
+if not LAZY_STARTUP:
+    print("🤖 Préchargement du modèle Whisper (cela peut prendre quelques instants)...")
+    load_whisper()
+    print("✅ Application prête!")
 
 app = FastAPI(title="Minuta API", version="0.1.0")
 
@@ -48,9 +96,34 @@ app.add_middleware(
 # Inclure les routes
 app.include_router(prompts.router)
 app.include_router(summary.router)
+app.include_router(transcriptions.router)
+
+# Rechargement à chaud de la configuration LLM (modification de backend/.env ou SIGHUP)
+config_watcher = ConfigWatcher(summary.reload_llm_service)
+
+
+@app.on_event("startup")
+async def startup():
+    # Préchargement des modèles LLM locaux en tâche de fond : évite le chargement à froid
+    # d'Ollama lors du premier compte rendu
+    summary.start_llm_warmup()
+    config_watcher.start()
+    session_registry.start()
+    # Transcriptions de fichiers envoyés (API batch), après les sessions en direct
+    transcriptions.start_job_queue(transcription_scheduler)
+    if LAZY_STARTUP and readiness.state("whisper") == PENDING:
+        # Thread dédié : le modèle est chargé et le pool de processus Whisper démarré
+        # pendant que le serveur répond déjà aux requêtes
+        threading.Thread(target=load_whisper, name="whisper-loader", daemon=True).start()
+        print("✅ API prête (modèle Whisper en cours de chargement, voir /ready)")
+
 
-# Thread pool pour les transcriptions (éviter de bloquer le WebSocket)
-transcription_executor = ThreadPoolExecutor(max_workers=2)
+@app.on_event("shutdown")
+async def shutdown():
+    await config_watcher.stop()
+    await session_registry.stop()
+    await transcriptions.stop_job_queue()
+    await summary.close_llm_service()
 
 
 @app.get("/")
@@ -58,41 +131,64 @@ def root():
     return {"message": "Minuta API", "version": "0.1.0"}
 
 
-async def transcribe_partial(chunks: list[bytes], language: str, websocket: WebSocket):
-    """Transcrit les chunks de manière asynchrone et envoie le résultat partiel"""
+@app.get("/ready")
+def ready():
+    """
+    Disponibilité de l'application : avancement du chargement de chaque composant
+
+    Code 200 quand tous les composants sont prêts, 503 pendant le chargement ou après un échec.
+    """
+    components = readiness.status()
+    # Modèles LLM locaux : informatif, les providers cloud ne nécessitent pas de chargement
+    components["llm"] = {"state": "ready", "models": summary.get_llm_service().get_model_states()}
+    is_ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "components": components},
+    )
+
+
+async def transcribe_partial(session: RecordingSession, owner, websocket: WebSocket):
+    """Transcrit la fenêtre non validée de la session et envoie les segments nouveaux ou révisés"""
+    transcriber, cadence = session.transcriber, session.cadence
     try:
-        # Transcrire dans un thread pour ne pas bloquer
-        loop = asyncio.get_event_loop()
-        partial_text = await loop.run_in_executor(
-            transcription_executor,
-            whisper_service.transcribe_streaming,
-            chunks,
-            language,
-            True  # is_partial=True pour les transcriptions partielles
-        )
-        
-        if partial_text and partial_text.strip():
+        prepared = transcriber.next_window()
+        if prepared is None:
+            return
+        window_start, window = prepared
+
+        # Fenêtre regroupée avec celles des autres sessions dans un même lot d'inférence
+        future = transcription_scheduler.submit_partial(transcriber, window, transcriber.language)
+        if future is None:
+            return  # Une partielle de la session est déjà en cours de calcul
+        submitted_at = time.time()
+        try:
+            segments = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Remplacée par une partielle plus récente avant d'avoir démarré
+            cadence.record_dropped()
+            return
+        cadence.record(time.time() - submitted_at)
+        transcriber.apply_segments(window_start, window.size, segments)
+        if not session_registry.is_owner(session, owner):
+            # Session reprise par une connexion plus récente : les segments lui seront envoyés
+            # (ne pas avancer l'état des envois pour cette connexion abandonnée)
+            return
+
+        # Seuls les changements sont envoyés : le coût d'un message ne dépend pas de la
+        # durée de la réunion
+        delta = transcriber.delta()
+        if delta:
+            # stable : nouveaux segments validés, à ajouter (ne changeront plus)
+            # tentative : fin provisoire, remplace la précédente (absente si inchangée)
+            message = {"type": "delta", **delta}
             try:
-                await websocket.send_json({
-                    "type": "partial",
-                    "text": partial_text
-                })
-                print(f"Transcription partielle envoyée: {len(partial_text)} caractères")
+                await websocket.send_json(message)
+                print(f"Delta envoyé: {len(delta['stable'])} segment(s) stable(s), fin provisoire {'révisée' if 'tentative' in delta else 'inchangée'}")
             except Exception as e:
                 print(f"Erreur envoi transcription partielle: {e}")
-    except ValueError as e:
-        # Erreurs de validation (audio trop court, etc.) - envoyer au frontend
-        error_msg = str(e)
-        print(f"Erreur validation transcription partielle: {error_msg}")
-        try:
-            await websocket.send_json({
-                "type": "error",
-                "message": error_msg
-            })
-        except:
-            print("Impossible d'envoyer l'erreur, WebSocket fermé")
     except Exception as e:
-        # Autres erreurs - juste logger, ne pas interrompre le flux
+        # Erreurs - juste logger, ne pas interrompre le flux
         print(f"Erreur transcription partielle: {e}")
 
 
@@ -100,87 +196,141 @@ async def transcribe_partial(chunks: list[bytes], language: str, websocket: WebS
 async def websocket_transcribe(websocket: WebSocket):
     """Endpoint WebSocket pour la transcription en temps réel"""
     await websocket.accept()
-    
-    audio_chunks = []
-    chunks_for_partial = []  # Chunks accumulés depuis la dernière transcription partielle
-    is_recording = True
-    language = "fr"  # Par défaut français
-    last_partial_time = time.time()
-    partial_interval = 3.0  # Transcrire partiellement toutes les 3 secondes
+
+    # Modèle Whisper encore en chargement : l'audio est reçu et décodé normalement, les
+    # partielles commencent dès que le modèle est prêt et la finale l'attend
+    if readiness.state("whisper") == ERROR:
+        await websocket.send_json({
+            "type": "error",
+            "message": "Le modèle de transcription n'a pas pu être chargé. Consultez les logs du backend."
+        })
+        await websocket.close(code=1011)
+        return
+    if not readiness.is_ready("whisper"):
+        await websocket.send_json({"type": "status", "status": "loading", "components": readiness.status()})
+
+    # Session d'enregistrement : reprise si le client se reconnecte avec son identifiant
+    # (?session_id=...) après une coupure, sinon nouvelle session
+    owner = object()
+    session, resumed = await session_registry.open(websocket.query_params.get("session_id"), asr_service, owner)
+    stopped = False  # Arrêt demandé par le client (sinon connexion perdue : session reprenable)
+    total_bytes = 0
     partial_task = None
 
     try:
-        while is_recording:
+        transcriber = session.transcriber
+        if resumed:
+            print(f"Reprise de la session {session.session_id} ({session.spool.received_bytes} bytes déjà reçus)")
+        # Le client renvoie l'audio à partir de received_bytes et retrouve les segments déjà
+        # transcrits ; les deltas suivants partent de cet état
+        snapshot = transcriber.snapshot() if transcriber else {"stable": [], "tentative": []}
+        await websocket.send_json({
+            "type": "session",
+            "session_id": session.session_id,
+            "resumed": resumed,
+            "received_bytes": session.spool.received_bytes,
+            "stable": snapshot["stable"],
+            "tentative": snapshot["tentative"],
+            # Reprise depuis le spool : le client conserve son texte, les segments suivants s'y ajoutent
+            "replayed": bool(transcriber and transcriber.replayed),
+        })
+
+        while True:
             # Recevoir les données (peut être du JSON ou des bytes)
             try:
                 data = await websocket.receive()
             except WebSocketDisconnect:
-                is_recording = False
                 break
+            if data.get("type") == "websocket.disconnect":
+                break
+            if not session_registry.is_owner(session, owner):
+                break  # Session reprise par une connexion plus récente
 
             if "text" in data:
                 # Message texte (ex: {"type": "stop"} ou {"language": "fr"})
                 try:
                     message = json.loads(data["text"])
                     if message.get("type") == "stop":
-                        is_recording = False
+                        stopped = True
                         break
                     elif "language" in message:
-                        language = message["language"]
-                        print(f"Langue sélectionnée: {language}")
+                        session.set_language(message["language"])
+                        print(f"Langue sélectionnée: {session.language}")
                 except (json.JSONDecodeError, KeyError):
                     pass
             elif "bytes" in data:
                 # Chunk audio (webm/opus)
                 chunk_bytes = data["bytes"]
-                audio_chunks.append(chunk_bytes)
-                chunks_for_partial.append(chunk_bytes)
-                print(f"Chunk audio reçu: {len(chunk_bytes)} bytes (total: {len(audio_chunks)} chunks)")
+                session.chunk_count += 1
+                total_bytes += len(chunk_bytes)
+                transcriber = session.get_transcriber(asr_service)
+                # Décoder uniquement le nouvel audio, au fil de l'eau
+                transcriber.feed(chunk_bytes)
+                print(f"Chunk audio reçu: {len(chunk_bytes)} bytes (total: {session.chunk_count} chunks)")
                 
                 # Vérifier si on doit faire une transcription partielle
                 current_time = time.time()
-                if current_time - last_partial_time >= partial_interval and len(chunks_for_partial) > 0:
-                    # Transcrire les chunks accumulés depuis la dernière transcription partielle
-                    chunks_to_transcribe = chunks_for_partial.copy()
-                    chunks_for_partial = []  # Réinitialiser pour la prochaine période
-                    last_partial_time = current_time
-                    
-                    # Lancer la transcription partielle de manière asynchrone
-                    if partial_task and not partial_task.done():
-                        # Annuler la tâche précédente si elle n'est pas terminée
-                        partial_task.cancel()
-                    partial_task = asyncio.create_task(
-                        transcribe_partial(chunks_to_transcribe, language, websocket)
-                    )
-
-        # Attendre que la dernière transcription partielle soit terminée
+                if current_time - session.last_partial_time >= session.cadence.interval and readiness.is_ready("whisper"):
+                    # Le moteur conserve l'état de la session : ne pas lancer une nouvelle
+                    # partielle tant que la précédente est en cours de calcul. Si elle attend
+                    # encore dans la file, la nouvelle (plus récente) la remplace.
+                    if not transcription_scheduler.is_running(transcriber):
+                        session.last_partial_time = current_time
+                        partial_task = asyncio.create_task(
+                            transcribe_partial(session, owner, websocket)
+                        )
+
+        # Attendre que la dernière transcription partielle soit terminée : son résultat est
+        # intégré à la session, même si la connexion est perdue
         if partial_task and not partial_task.done():
+            if stopped and transcriber:
+                # Une partielle encore en file est inutile : la transcription finale va tout couvrir
+                transcription_scheduler.cancel_partial(transcriber)
             try:
                 await partial_task
             except asyncio.CancelledError:
                 pass
 
-        # Transcription finale - combiner tous les chunks en un seul fichier
-        if audio_chunks:
+        if not stopped:
+            # Connexion perdue pendant l'enregistrement : la session reste reprenable
+            print(f"Session {session.session_id} interrompue, reprise possible ({total_bytes} bytes reçus)")
+            return
+
+        # Session commencée pendant le chargement du modèle : la finale attend qu'il soit prêt
+        model_ready = True
+        if transcriber and not readiness.is_ready("whisper"):
+            print("Transcription finale en attente du chargement du modèle Whisper...")
+            model_ready = await asyncio.to_thread(readiness.wait, "whisper", MODEL_READY_TIMEOUT)
+        if transcriber:
+            # Session commencée avant le démarrage du pool de processus : la finale y est envoyée
+            transcriber.whisper_service = asr_service
+
+        # Transcription finale - réutilise le PCM déjà décodé pendant la session
+        if transcriber and not model_ready:
+            try:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": "Le modèle de transcription n'est pas disponible. Réessayez dans quelques instants."
+                })
+            except:
+                print("Impossible d'envoyer l'erreur, WebSocket fermé")
+        elif transcriber:
             try:
-                total_bytes = sum(len(chunk) for chunk in audio_chunks)
-                print(f"Transcription finale de {len(audio_chunks)} chunks audio ({total_bytes} bytes total)...")
+                print(f"Transcription finale de {session.chunk_count} chunks audio ({session.spool.received_bytes} bytes total)...")
                 
-                # Transcrire dans un thread pour ne pas bloquer
-                loop = asyncio.get_event_loop()
-                final_text = await loop.run_in_executor(
-                    transcription_executor,
-                    whisper_service.transcribe_streaming,
-                    audio_chunks,
-                    language
+                # Transcrire dans un thread pour ne pas bloquer (prioritaire sur les partielles)
+                final = await asyncio.wrap_future(
+                    transcription_scheduler.submit_final(transcriber.transcribe_final)
                 )
+                final_text = final["text"]
                 
                 # Vérifier si la connexion WebSocket est encore ouverte
                 try:
                     if final_text and final_text.strip():
                         await websocket.send_json({
                             "type": "final",
-                            "text": final_text
+                            "text": final_text,
+                            "segments": final["segments"],  # Remplacent les segments reçus pendant la session
                         })
                         print(f"Transcription finale envoyée: {len(final_text)} caractères - '{final_text[:50]}...'")
                     else:
@@ -227,6 +377,9 @@ async def websocket_transcribe(websocket: WebSocket):
             })
         except:
             pass
+    finally:
+        # Session terminée (ou sans audio) : supprimée, sinon conservée pour une reprise
+        session_registry.release(session, owner, finished=stopped)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class SummaryCacheEntry(Base):
+    __tablename__ = "summary_cache"
+
+    # Empreinte SHA-256 du prompt, de la transcription, du modèle et des paramètres de génération
+    key = Column(String(64), primary_key=True)
+    prompt_id = Column(Integer, nullable=True, index=True)
+    model = Column(String, nullable=False)
+    summary = Column(String, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    audio_path = Column(String, nullable=False)  # Fichier envoyé, supprimé une fois traité
+    language = Column(String, nullable=True)  # None = auto-détection
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, done, error
+    text = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)  # Durée de l'audio en secondes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -6,6 +6,7 @@ from datetime import datetime
 
 from app.db.database import get_db
 from app.models.prompt import Prompt
+from app.services.summary_cache import summary_cache
 
 router = APIRouter(prefix="/api/prompts", tags=["prompts"])
 
@@ -72,9 +73,13 @@ def update_prompt(
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
 
+    content_changed = prompt.content != prompt_data.content
     prompt.title = prompt_data.title
     prompt.content = prompt_data.content
     db.commit()
+    if content_changed:
+        # Les comptes rendus générés avec l'ancien contenu ne sont plus valides
+        summary_cache.invalidate_prompt(db, prompt_id)
     db.refresh(prompt)
     return prompt
 
@@ -88,4 +93,5 @@ def delete_prompt(prompt_id: int, db: Session = Depends(get_db)):
 
     db.delete(prompt)
     db.commit()
+    summary_cache.invalidate_prompt(db, prompt_id)
     return None
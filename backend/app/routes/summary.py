@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List
-from dotenv import load_dotenv
-import os
+from typing import Dict, List
+import asyncio
+import json
 
-from app.db.database import get_db
+from app.config import Settings
+from app.db.database import SessionLocal, get_db
 from app.models.prompt import Prompt
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLM_TIMEOUT_SECONDS, LLMService
+from app.services.summary_cache import summary_cache
 
 router = APIRouter(prefix="/api", tags=["summary"])
 
@@ -16,30 +20,53 @@ _llm_service: LLMService = None
 
 
 def get_llm_service() -> LLMService:
-    """Retourne le service LLM (singleton)"""
+    """Retourne le service LLM (singleton, configuration chargée une seule fois)"""
     global _llm_service
-    
-    # S'assurer que le .env est chargé (au cas où il n'aurait pas été chargé au démarrage)
-    # Chercher le fichier .env dans le répertoire backend
-    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    env_path = os.path.join(backend_dir, '.env')
-    if os.path.exists(env_path):
-        load_dotenv(env_path, override=True)
-    else:
-        # Essayer aussi le répertoire courant
-        load_dotenv(override=True)
-    
-    # Créer le service seulement s'il n'existe pas encore
-    # Le service sera recréé au redémarrage du backend si la config change
     if _llm_service is None:
         _llm_service = LLMService()
     return _llm_service
 
 
+def reload_llm_service(settings: Settings):
+    """
+    Remplace le service LLM après un changement de configuration (rechargement à chaud)
+
+    Le nouveau service est construit avant d'être installé : une configuration invalide
+    laisse l'ancien en place. Les requêtes en cours terminent sur l'ancien service, dont le
+    pool de connexions est fermé une fois le délai maximal d'une requête écoulé. Les limiteurs
+    de débit des modèles dont les limites n'ont pas changé sont repris par le nouveau service.
+    """
+    global _llm_service
+    service = LLMService(settings, previous=_llm_service)
+    old_service, _llm_service = _llm_service, service
+    if old_service is not None and old_service.warmer is not None:
+        asyncio.create_task(old_service.warmer.stop())
+    service.start_warmup()
+    print(f"✅ Service LLM rechargé (provider: {service.provider.value})")
+
+    if old_service is not None:
+        async def close_later():
+            await asyncio.sleep(LLM_TIMEOUT_SECONDS)
+            await old_service.aclose()
+        asyncio.create_task(close_later())
+
+
+def start_llm_warmup():
+    """Crée le service LLM et lance le préchargement des modèles locaux (démarrage de l'application)"""
+    get_llm_service().start_warmup()
+
+
+async def close_llm_service():
+    """Ferme le pool de connexions du service LLM (arrêt de l'application)"""
+    if _llm_service is not None:
+        await _llm_service.aclose()
+
+
 class GenerateSummaryRequest(BaseModel):
     transcription: str
     prompt_id: int
     model: str = None  # Si None, utilise le modèle par défaut du provider
+    regenerate: bool = False  # Ignore le cache et génère un nouveau compte rendu
 
 
 class GenerateSummaryResponse(BaseModel):
@@ -50,6 +77,8 @@ class ModelsResponse(BaseModel):
     provider: str
     models: List[str]
     default_model: str
+    # État de chargement des modèles locaux (warm, cold, warming, error)
+    model_states: Dict[str, str] = {}
 
 
 @router.get("/models", response_model=ModelsResponse)
@@ -63,7 +92,8 @@ def get_models():
         return ModelsResponse(
             provider=llm_service.get_provider().value,
             models=models,
-            default_model=default_model
+            default_model=default_model,
+            model_states=llm_service.get_model_states(),
         )
     except Exception as e:
         import traceback
@@ -72,11 +102,18 @@ def get_models():
         raise HTTPException(status_code=500, detail=f"Error getting models: {str(e)}")
 
 
-@router.post("/generate-summary", response_model=GenerateSummaryResponse)
-def generate_summary(
-    request: GenerateSummaryRequest, db: Session = Depends(get_db)
-):
-    """Génère un compte rendu à partir d'une transcription et d'un prompt"""
+@router.get("/models/budget")
+def get_models_budget():
+    """Budget de débit (requêtes et tokens par minute) disponible pour chaque modèle limité"""
+    llm_service = get_llm_service()
+    return {
+        "provider": llm_service.get_provider().value,
+        "budgets": llm_service.get_rate_limit_budgets(),
+    }
+
+
+def _prepare_summary(request: GenerateSummaryRequest, db: Session, llm_service: LLMService) -> tuple:
+    """Valide la requête de compte rendu et retourne (prompt, modèle)"""
     # Récupérer le prompt
     prompt = db.query(Prompt).filter(Prompt.id == request.prompt_id).first()
     if not prompt:
@@ -86,32 +123,77 @@ def generate_summary(
     if not request.transcription or not request.transcription.strip():
         raise HTTPException(status_code=400, detail="Transcription cannot be empty")
 
+    # Si aucun modèle spécifié, utiliser le modèle par défaut
+    model = request.model
+    if model is None:
+        available_models = llm_service.get_available_models()
+        if not available_models:
+            raise HTTPException(status_code=500, detail="Aucun modèle disponible")
+        model = available_models[0]
+    
+    # Valider le modèle
+    if not llm_service.is_model_available(model):
+        available_models = llm_service.get_available_models()
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Modèle invalide. Modèles disponibles: {', '.join(available_models)}"
+        )
+    return prompt, model
+
+
+def _lookup_cache(
+    request: GenerateSummaryRequest, db: Session, llm_service: LLMService
+) -> tuple:
+    """Valide la requête et cherche le compte rendu en cache : (prompt, modèle, clé, compte rendu ou None)"""
+    prompt, model = _prepare_summary(request, db, llm_service)
+    key = summary_cache.make_key(
+        prompt.content, request.transcription, model, llm_service.generation_params()
+    )
+    cached = None if request.regenerate else summary_cache.get(db, key)
+    return prompt, model, key, cached
+
+
+def _store_in_cache(key: str, prompt_id: int, model: str, summary: str):
+    """Enregistre un compte rendu dans le cache (session dédiée, sans faire échouer la génération)"""
+    db = SessionLocal()
+    try:
+        summary_cache.put(db, key, prompt_id, model, summary)
+    except Exception as e:
+        print(f"Erreur lors de l'enregistrement du compte rendu en cache: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+@router.post("/generate-summary", response_model=GenerateSummaryResponse)
+async def generate_summary(
+    request: GenerateSummaryRequest, db: Session = Depends(get_db)
+):
+    """
+    Génère un compte rendu à partir d'une transcription et d'un prompt
+
+    Route asynchrone : l'attente du provider n'immobilise pas de thread du serveur.
+    """
     try:
         # Obtenir le service LLM
         llm_service = get_llm_service()
-        
-        # Si aucun modèle spécifié, utiliser le modèle par défaut
-        model = request.model
-        if model is None:
-            available_models = llm_service.get_available_models()
-            if not available_models:
-                raise HTTPException(status_code=500, detail="Aucun modèle disponible")
-            model = available_models[0]
-        
-        # Valider le modèle
-        if not llm_service.is_model_available(model):
-            available_models = llm_service.get_available_models()
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Modèle invalide. Modèles disponibles: {', '.join(available_models)}"
-            )
+        # Requêtes SQLite synchrones, exécutées hors de la boucle d'événements
+        prompt, model, key, cached = await run_in_threadpool(_lookup_cache, request, db, llm_service)
+        if cached is not None:
+            print(f"Compte rendu servi depuis le cache ({model})")
+            return GenerateSummaryResponse(summary=cached)
 
         # Générer le compte rendu
-        summary = llm_service.generate_summary(
+        route = {}
+        summary = await llm_service.agenerate_summary(
             prompt.content, 
             request.transcription, 
-            model=model
+            model=model,
+            route=route,
         )
+        # Un compte rendu produit par un modèle de secours n'est pas mis en cache
+        if route.get("model") == model:
+            await run_in_threadpool(_store_in_cache, key, prompt.id, model, summary)
         return GenerateSummaryResponse(summary=summary)
     except HTTPException:
         raise
@@ -123,3 +205,74 @@ def generate_summary(
         # Utiliser le message d'erreur de l'exception si disponible, sinon un message générique
         error_message = str(e) if str(e) else "Erreur inconnue lors de la génération du compte rendu"
         raise HTTPException(status_code=500, detail=error_message)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/generate-summary/stream")
+async def generate_summary_stream(
+    request: GenerateSummaryRequest, db: Session = Depends(get_db)
+):
+    """
+    Génère un compte rendu en streaming (Server-Sent Events)
+
+    Événements envoyés :
+    - delta : {"text": fragment du compte rendu}
+    - done : {"provider", "model", "ttft_ms", "total_ms", "characters", "parts", "cached"}
+    - error : {"detail": message d'erreur}
+
+    Un compte rendu en cache est envoyé en un seul événement delta.
+    """
+    llm_service = get_llm_service()
+    prompt, model, key, cached = await run_in_threadpool(_lookup_cache, request, db, llm_service)
+    prompt_id, prompt_content = prompt.id, prompt.content
+
+    async def events():
+        if cached is not None:
+            print(f"Compte rendu servi depuis le cache ({model})")
+            yield _sse_event("delta", {"text": cached})
+            yield _sse_event("done", {
+                "provider": llm_service.get_provider().value, "model": model,
+                "ttft_ms": 0, "total_ms": 0, "characters": len(cached), "cached": True,
+            })
+            return
+
+        metrics = {}
+        parts = []
+        try:
+            async for delta in llm_service.stream_summary(
+                prompt_content, request.transcription, model=model, metrics=metrics
+            ):
+                parts.append(delta)
+                yield _sse_event("delta", {"text": delta})
+            if metrics.get("model") == model:
+                await run_in_threadpool(_store_in_cache, key, prompt_id, model, "".join(parts))
+            yield _sse_event("done", {**metrics, "cached": False})
+        except Exception as e:
+            # Les en-têtes sont déjà envoyés : l'erreur est transmise dans le flux
+            error_message = str(e) if str(e) else "Erreur inconnue lors de la génération du compte rendu"
+            yield _sse_event("error", {"detail": error_message})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Désactive la mise en tampon de Nginx
+        },
+    )
+
+
+@router.get("/generate-summary/stats")
+def get_summary_stats(db: Session = Depends(get_db)):
+    """Temps jusqu'au premier token des dernières générations, état des providers et du cache"""
+    llm_service = get_llm_service()
+    return {
+        **llm_service.get_latency_stats(),
+        "routes": llm_service.get_routing_stats(),
+        "warmup": llm_service.warmer.status() if llm_service.warmer is not None else {},
+        "cache": summary_cache.stats(db),
+    }
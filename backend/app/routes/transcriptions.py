@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from pathlib import Path
+
+from app.db.database import get_db
+from app.models.transcription_job import TranscriptionJob
+from app.services.transcription_jobs import DONE, RUNNING, TranscriptionJobQueue
+
+router = APIRouter(prefix="/api/transcriptions", tags=["transcriptions"])
+
+# File des transcriptions (singleton), démarrée avec l'application
+_job_queue: TranscriptionJobQueue = None
+
+
+def start_job_queue(scheduler):
+    """Crée la file des transcriptions et démarre ses workers (démarrage de l'application)"""
+    global _job_queue
+    _job_queue = TranscriptionJobQueue(scheduler)
+    _job_queue.start()
+
+
+async def stop_job_queue():
+    """Arrête les workers (les travaux en cours seront repris au prochain démarrage)"""
+    if _job_queue is not None:
+        await _job_queue.stop()
+
+
+class TranscriptionJobResponse(BaseModel):
+    id: int
+    filename: str
+    language: Optional[str] = None
+    status: str  # queued, running, done, error
+    error: Optional[str] = None
+    duration: Optional[float] = None
+    queue_position: Optional[int] = None  # Travaux en attente avant celui-ci
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TranscriptionResultResponse(BaseModel):
+    id: int
+    text: str
+    duration: Optional[float] = None
+
+
+def _get_job(db: Session, job_id: int) -> TranscriptionJob:
+    job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    return job
+
+
+def _job_response(db: Session, job: TranscriptionJob) -> TranscriptionJobResponse:
+    response = TranscriptionJobResponse.model_validate(job)
+    if _job_queue is not None:
+        response.queue_position = _job_queue.queue_position(db, job)
+    return response
+
+
+@router.post("", response_model=TranscriptionJobResponse, status_code=202)
+async def create_transcription(
+    file: UploadFile = File(...),
+    language: str = Form("fr"),
+    db: Session = Depends(get_db),
+):
+    """
+    Envoie un fichier audio à transcrire (webm, wav, mp3, m4a, ... tout format lu par ffmpeg)
+
+    La transcription est traitée en arrière-plan : suivre son état avec GET /api/transcriptions/{id}
+    et récupérer le texte avec GET /api/transcriptions/{id}/result. language="auto" pour
+    l'auto-détection.
+    """
+    if _job_queue is None:
+        raise HTTPException(status_code=503, detail="La file des transcriptions n'est pas démarrée")
+    # Copie sur disque par blocs, hors de la boucle d'événements
+    job = await run_in_threadpool(
+        _job_queue.submit,
+        Path(file.filename or "audio").name,
+        file.file,
+        None if language in ("", "auto") else language,
+    )
+    return _job_response(db, job)
+
+
+@router.get("", response_model=List[TranscriptionJobResponse])
+def list_transcriptions(limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)):
+    """Liste les transcriptions, les plus récentes en premier"""
+    jobs = db.query(TranscriptionJob).order_by(TranscriptionJob.id.desc()).limit(limit).all()
+    return [_job_response(db, job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=TranscriptionJobResponse)
+def get_transcription(job_id: int, db: Session = Depends(get_db)):
+    """État d'une transcription"""
+    return _job_response(db, _get_job(db, job_id))
+
+
+@router.get("/{job_id}/result", response_model=TranscriptionResultResponse)
+def get_transcription_result(job_id: int, db: Session = Depends(get_db)):
+    """Texte d'une transcription terminée"""
+    job = _get_job(db, job_id)
+    if job.status != DONE:
+        detail = job.error if job.error else f"Transcription not finished (status: {job.status})"
+        raise HTTPException(status_code=409, detail=detail)
+    return TranscriptionResultResponse(id=job.id, text=job.text or "", duration=job.duration)
+
+
+@router.delete("/{job_id}", status_code=204)
+def delete_transcription(job_id: int, db: Session = Depends(get_db)):
+    """Supprime une transcription et son fichier (impossible pendant son traitement)"""
+    job = _get_job(db, job_id)
+    if job.status == RUNNING:
+        raise HTTPException(status_code=409, detail="Transcription in progress")
+    Path(job.audio_path).unlink(missing_ok=True)
+    db.delete(job)
+    db.commit()
+    return None
@@ -0,0 +1,255 @@
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+# Mode d'optimisation CPU : quantification int8 dynamique et threads torch dimensionnés
+# selon le nombre de transcriptions simultanées (WHISPER_CPU_OPTIMIZE=1)
+CPU_OPTIMIZE = os.getenv("WHISPER_CPU_OPTIMIZE", "0") == "1"
+
+
+def cpu_threads_per_job(concurrent_jobs: int) -> int:
+    """Nombre de threads de calcul par transcription pour ne pas surcharger les cœurs"""
+    return max(1, (os.cpu_count() or 1) // max(1, concurrent_jobs))
+
+
+def configure_torch_threads(threads: int):
+    """Fixe les threads intra-op et inter-op de torch"""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        # Les transcriptions concurrentes sont déjà parallélisées par le pool de workers
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Ne peut être modifié qu'une fois, avant tout calcul parallèle
+        pass
+    print(f"Threads torch: {threads} intra-op par transcription, 1 inter-op")
+
+
+def quantize_linear_layers(model):
+    """
+    Quantifie dynamiquement en int8 les couches Linear d'un modèle openai-whisper (CPU uniquement)
+
+    whisper.model.Linear ne redéfinit que forward() pour le fp16 : on la ramène à
+    torch.nn.Linear pour que quantize_dynamic la reconnaisse.
+    """
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ASREngine(ABC):
+    """
+    Interface commune des moteurs de reconnaissance vocale utilisés par WhisperService
+
+    Les options de transcription suivent les noms d'openai-whisper (language, beam_size,
+    best_of, temperature, initial_prompt, ...). Chaque moteur retourne un dictionnaire
+    {"text": str, "segments": [{"start", "end", "text", "avg_logprob", "no_speech_prob"}]}
+    (scores de confiance quand le moteur les fournit).
+    """
+
+    name = "base"
+
+    def __init__(self, model_size: str, device: str, cpu_threads: int = 0, cpu_optimize: bool = False):
+        self.model_size = model_size
+        self.device = device
+        self.cpu_threads = cpu_threads  # 0 = valeur par défaut de la bibliothèque
+        self.cpu_optimize = cpu_optimize and device == "cpu"
+        self.model = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    @abstractmethod
+    def load(self):
+        """Charge le modèle"""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, language: str = None, **options) -> dict:
+        """Transcrit un audio PCM float32 mono 16 kHz"""
+
+    def transcribe_batch(self, windows: list[np.ndarray], language: str = None, **options) -> list[list[dict]]:
+        """
+        Transcrit plusieurs fenêtres courtes (≤ 30 s) et retourne les segments de chacune
+
+        Implémentation par défaut séquentielle ; les moteurs qui le permettent la remplacent
+        par une vraie inférence par lot.
+        """
+        return [self.transcribe(window, language=language, **options)["segments"] for window in windows]
+
+
+class OpenAIWhisperEngine(ASREngine):
+    """Moteur openai-whisper (PyTorch)"""
+
+    name = "openai-whisper"
+
+    def load(self):
+        from app.services.whisper_model_store import load_openai_whisper
+
+        # Poids projetés en mémoire depuis le magasin de modèles (partagés entre processus)
+        model = load_openai_whisper(self.model_size, self.device)
+        if self.cpu_optimize:
+            if self.cpu_threads:
+                configure_torch_threads(self.cpu_threads)
+            model = quantize_linear_layers(model)
+            print("Couches Linear quantifiées en int8 (quantification dynamique)")
+        self.model = model
+
+    def transcribe(self, audio: np.ndarray, language: str = None, **options) -> dict:
+        return self.model.transcribe(audio, language=language, **options)
+
+    def transcribe_batch(self, windows: list[np.ndarray], language: str = None, **options) -> list[list[dict]]:
+        """Encode et décode toutes les fenêtres en un seul lot (une fenêtre mel de 30 s chacune)"""
+        import torch
+        import whisper
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(window), n_mels=self.model.dims.n_mels, device=self.model.device
+            )
+            for window in windows
+        ])
+        decode_options = whisper.DecodingOptions(
+            language=language,
+            task="transcribe",
+            temperature=0.0,
+            beam_size=options.get("beam_size"),
+            fp16=self.device == "cuda",
+            without_timestamps=False,  # Les timestamps délimitent les segments stables/provisoires
+        )
+        results = whisper.decode(self.model, mels, decode_options)
+        tokenizer = whisper.tokenizer.get_tokenizer(
+            self.model.is_multilingual, num_languages=self.model.num_languages, task="transcribe"
+        )
+        batch = []
+        for window, result in zip(windows, results):
+            # Même règle que whisper.transcribe pour écarter les fenêtres sans parole
+            if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+                batch.append([])
+                continue
+            segments = _segments_from_tokens(tokenizer, result.tokens, len(window) / whisper.audio.SAMPLE_RATE)
+            # Un seul décodage par fenêtre : ses scores valent pour tous ses segments
+            for segment in segments:
+                segment.update(avg_logprob=result.avg_logprob, no_speech_prob=result.no_speech_prob)
+            batch.append(segments)
+        return batch
+
+
+def _segments_from_tokens(tokenizer, tokens: list[int], duration: float) -> list[dict]:
+    """Découpe une séquence de tokens avec timestamps (<|0.00|> texte <|2.40|>) en segments"""
+    segments = []
+    start = None
+    last_time = 0.0  # Dernier timestamp rencontré
+    text_tokens: list[int] = []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            timestamp = (token - tokenizer.timestamp_begin) * 0.02  # Précision de 20 ms
+            if text_tokens:
+                segment_start = start if start is not None else last_time
+                segments.append({"start": segment_start, "end": timestamp, "text": tokenizer.decode(text_tokens)})
+                text_tokens = []
+                start = None
+            else:
+                start = timestamp
+            last_time = timestamp
+        else:
+            text_tokens.append(token)
+    if text_tokens:
+        # Segment non terminé : il court de son dernier timestamp jusqu'à la fin de la fenêtre
+        segment_start = start if start is not None else last_time
+        segments.append({"start": segment_start, "end": duration, "text": tokenizer.decode(text_tokens)})
+    return segments
+
+
+class FasterWhisperEngine(ASREngine):
+    """
+    Moteur faster-whisper (CTranslate2), quantifié en int8 sur CPU
+
+    Plusieurs fois plus rapide qu'openai-whisper en FP32 sur les machines sans GPU.
+    """
+
+    name = "faster-whisper"
+
+    # Options openai-whisper sans équivalent dans faster-whisper
+    _UNSUPPORTED_OPTIONS = {"verbose", "fp16"}
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "Le moteur faster-whisper nécessite le paquet 'faster-whisper' "
+                "(pip install faster-whisper)."
+            ) from e
+
+        # CTranslate2 ne supporte pas MPS : repli sur le CPU
+        device = "cuda" if self.device == "cuda" else "cpu"
+        default_compute_type = "float16" if device == "cuda" else "int8"
+        compute_type = os.getenv("WHISPER_COMPUTE_TYPE", default_compute_type)
+        print(f"faster-whisper: device={device}, compute_type={compute_type}")
+        cpu_threads = self.cpu_threads if self.cpu_optimize else 0
+        self.model = WhisperModel(
+            self.model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads
+        )
+
+    def transcribe(self, audio: np.ndarray, language: str = None, **options) -> dict:
+        options = {k: v for k, v in options.items() if k not in self._UNSUPPORTED_OPTIONS}
+        segments, _info = self.model.transcribe(audio, language=language, **options)
+        result_segments = [
+            {
+                "start": s.start,
+                "end": s.end,
+                "text": s.text,
+                "avg_logprob": s.avg_logprob,
+                "no_speech_prob": s.no_speech_prob,
+            }
+            for s in segments  # Générateur : la transcription s'exécute pendant l'itération
+        ]
+        return {
+            "text": "".join(s["text"] for s in result_segments),
+            "segments": result_segments,
+        }
+
+
+ENGINES = {
+    OpenAIWhisperEngine.name: OpenAIWhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+
+def create_engine(
+    model_size: str,
+    device: str,
+    name: str = None,
+    concurrent_jobs: int = 1,
+    cpu_optimize: bool = None,
+) -> ASREngine:
+    """
+    Crée le moteur de transcription configuré
+
+    Args:
+        model_size: Taille du modèle Whisper (tiny, base, small, medium, large)
+        device: Device détecté (cuda, mps, cpu)
+        name: Nom du moteur. Si None, lu dans WHISPER_ENGINE (défaut: openai-whisper)
+        concurrent_jobs: Nombre de transcriptions simultanées, pour répartir les threads CPU
+        cpu_optimize: Active le mode d'optimisation CPU. Si None, lu dans WHISPER_CPU_OPTIMIZE
+    """
+    name = name or os.getenv("WHISPER_ENGINE", OpenAIWhisperEngine.name)
+    if name not in ENGINES:
+        raise ValueError(
+            f"Moteur de transcription '{name}' inconnu. Moteurs disponibles: {', '.join(ENGINES)}"
+        )
+    if cpu_optimize is None:
+        cpu_optimize = CPU_OPTIMIZE
+    return ENGINES[name](
+        model_size,
+        device,
+        cpu_threads=cpu_threads_per_job(concurrent_jobs),
+        cpu_optimize=cpu_optimize,
+    )
@@ -0,0 +1,188 @@
+import io
+import subprocess
+import threading
+import wave
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000  # Fréquence d'échantillonnage attendue par Whisper
+
+# Sortie ffmpeg commune : PCM float32 mono 16 kHz brut, écrit sur stdout
+FFMPEG_PCM_OUTPUT_ARGS = [
+    "-f", "f32le",
+    "-ar", str(SAMPLE_RATE),  # Sample rate 16kHz (requis par Whisper)
+    "-ac", "1",  # Mono
+    "pipe:1",
+]
+
+
+def decode_audio(audio_data: bytes) -> np.ndarray:
+    """
+    Décode un buffer audio (webm/opus, WAV, ...) en PCM via un pipe ffmpeg, sans fichier temporaire
+
+    Args:
+        audio_data: Données audio encodées
+
+    Returns:
+        Échantillons float32 mono 16 kHz, directement utilisables par Whisper
+    """
+    # WAV déjà au format Whisper : conversion directe en mémoire, sans lancer ffmpeg
+    pcm = _read_whisper_wav(audio_data)
+    if pcm is not None:
+        return pcm
+
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-i", "pipe:0", *FFMPEG_PCM_OUTPUT_ARGS],
+            input=audio_data,
+            check=True,
+            capture_output=True,
+        )
+    except subprocess.CalledProcessError as e:
+        details = e.stderr.decode(errors="ignore").strip()[:200]
+        raise ValueError(
+            f"Impossible de décoder l'audio. Le fichier est peut-être corrompu. ({details})"
+        ) from e
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def decode_file(path: str) -> np.ndarray:
+    """
+    Décode un fichier audio ou vidéo (tout format lu par ffmpeg) en PCM, lu directement par ffmpeg
+
+    Le fichier n'est pas chargé en mémoire : seul le PCM décodé l'est.
+
+    Returns:
+        Échantillons float32 mono 16 kHz
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-i", str(path), "-vn", *FFMPEG_PCM_OUTPUT_ARGS],
+            check=True,
+            capture_output=True,
+        )
+    except subprocess.CalledProcessError as e:
+        details = e.stderr.decode(errors="ignore").strip()[:200]
+        raise ValueError(
+            f"Impossible de décoder le fichier audio. Format non supporté ou fichier corrompu. ({details})"
+        ) from e
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def pcm_duration(samples: np.ndarray) -> float:
+    """Durée en secondes d'un buffer PCM 16 kHz, calculée à partir du nombre d'échantillons"""
+    return samples.size / SAMPLE_RATE
+
+
+def wav_duration(wav_data: bytes) -> float:
+    """
+    Durée d'un fichier WAV lue dans son en-tête, en mémoire (sans ffprobe)
+
+    Args:
+        wav_data: Contenu du fichier WAV
+
+    Returns:
+        Durée en secondes, ou 0.0 si l'en-tête est invalide
+    """
+    try:
+        with wave.open(io.BytesIO(wav_data)) as wav:
+            frame_size = wav.getsampwidth() * wav.getnchannels()
+            # L'en-tête d'un WAV produit en streaming peut annoncer une taille erronée
+            frames = min(wav.getnframes(), len(wav_data) // max(frame_size, 1))
+            return frames / wav.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError) as e:
+        print(f"Impossible de lire l'en-tête WAV: {e}")
+        return 0.0
+
+
+def _read_whisper_wav(audio_data: bytes):
+    """Lit un WAV PCM 16 bits mono 16 kHz directement, ou retourne None pour tout autre format"""
+    if not audio_data.startswith(b"RIFF"):
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_data)) as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                return None
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class StreamingDecoder:
+    """
+    Décodeur webm/opus -> PCM persistant pour une session WebSocket
+
+    Un unique processus ffmpeg, lancé une fois par session, reçoit les chunks MediaRecorder
+    sur stdin au fil de l'eau et produit du PCM float32 16 kHz sur stdout, lu en continu
+    par un thread dédié. Aucun processus n'est lancé pendant les transcriptions.
+    """
+
+    def __init__(self):
+        self._process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-loglevel", "error",
+                "-probesize", "32768",  # L'en-tête webm tient dans le premier chunk
+                "-analyzeduration", "500000",
+                "-i", "pipe:0",
+                "-flush_packets", "1",
+                *FFMPEG_PCM_OUTPUT_ARGS,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+        self._failed = False
+        self._reader = threading.Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+    def _read_stdout(self):
+        """Lit le PCM produit par ffmpeg jusqu'à la fermeture du pipe"""
+        while True:
+            data = self._process.stdout.read1(65536)
+            if not data:
+                break
+            with self._lock:
+                self._pending.extend(data)
+
+    def feed(self, chunk: bytes):
+        """Envoie un chunk webm à ffmpeg"""
+        if self._failed:
+            return
+        try:
+            self._process.stdin.write(chunk)
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            # ffmpeg s'est arrêté (flux invalide) : ne pas répéter l'erreur à chaque chunk
+            self._failed = True
+            print(f"Décodeur ffmpeg indisponible: {e}")
+
+    def read_available(self) -> np.ndarray:
+        """Retourne les échantillons décodés depuis le dernier appel"""
+        with self._lock:
+            usable = len(self._pending) - len(self._pending) % 4
+            data = bytes(self._pending[:usable])
+            del self._pending[:usable]
+        return np.frombuffer(data, dtype=np.float32)
+
+    def finish(self) -> np.ndarray:
+        """Ferme l'entrée, attend la fin du décodage et retourne les derniers échantillons"""
+        self.close()
+        return self.read_available()
+
+    def close(self):
+        """Termine le processus ffmpeg"""
+        try:
+            if self._process.stdin and not self._process.stdin.closed:
+                self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._reader.join(timeout=1)
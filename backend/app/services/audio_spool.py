@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+# Répertoire des fichiers audio des sessions en cours (volume persistant backend/data en Docker)
+DEFAULT_SPOOL_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "spool"
+
+# Durée de conservation des sessions interrompues, pour une reprise (heures)
+SPOOL_TTL_HOURS = float(os.getenv("AUDIO_SPOOL_TTL_HOURS", "24"))
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def spool_dir() -> Path:
+    return Path(os.getenv("AUDIO_SPOOL_DIR") or DEFAULT_SPOOL_DIR)
+
+
+class AudioSpool:
+    """
+    Audio d'une session d'enregistrement, écrit sur disque au fil de l'eau
+
+    Deux fichiers par session : les chunks webm reçus (`<id>.webm`, pour reprendre le décodage
+    après une reconnexion) et le PCM float32 16 kHz décodé (`<id>.pcm`, lu par mmap pour la
+    transcription finale). La mémoire utilisée ne dépend pas de la durée de la réunion.
+    """
+
+    def __init__(self, session_id: str, root: Path = None):
+        """
+        Args:
+            session_id: Identifiant de session (32 caractères hexadécimaux)
+            root: Répertoire des spools (AUDIO_SPOOL_DIR, défaut backend/data/spool)
+        """
+        if not _SESSION_ID.match(session_id or ""):
+            raise ValueError(f"Identifiant de session invalide: {session_id!r}")
+        self.session_id = session_id
+        self.root = Path(root or spool_dir())
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.webm_path = self.root / f"{session_id}.webm"
+        self.pcm_path = self.root / f"{session_id}.pcm"
+        self._webm = open(self.webm_path, "ab")
+        self._pcm = open(self.pcm_path, "ab")
+
+    @classmethod
+    def create(cls, root: Path = None) -> "AudioSpool":
+        """Nouveau spool avec un identifiant de session aléatoire"""
+        return cls(uuid.uuid4().hex, root)
+
+    @classmethod
+    def exists(cls, session_id: str, root: Path = None) -> bool:
+        """Un spool existe pour cette session (reprise possible)"""
+        if not _SESSION_ID.match(session_id or ""):
+            return False
+        return (Path(root or spool_dir()) / f"{session_id}.webm").exists()
+
+    @property
+    def received_bytes(self) -> int:
+        """Octets webm reçus : le client reprend l'envoi à partir de cette position"""
+        return self._webm.tell()
+
+    @property
+    def pcm_samples(self) -> int:
+        return self._pcm.tell() // 4
+
+    def append_chunk(self, chunk: bytes):
+        self._webm.write(chunk)
+        self._webm.flush()  # Chunk durable même si la connexion est perdue juste après
+
+    def append_pcm(self, samples: np.ndarray):
+        if samples.size:
+            self._pcm.write(samples.astype(np.float32, copy=False).tobytes())
+
+    def read_chunks(self, block_size: int = 65536) -> Iterator[bytes]:
+        """Relit les chunks webm déjà reçus (reprise du décodage)"""
+        with open(self.webm_path, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return
+                yield block
+
+    def pcm(self) -> np.ndarray:
+        """Tout le PCM de la session, projeté en mémoire (aucune copie de l'enregistrement)"""
+        self._pcm.flush()
+        if self.pcm_samples == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(self.pcm_path, dtype=np.float32, mode="r", shape=(self.pcm_samples,))
+
+    def truncate_pcm(self, samples: int):
+        """Ramène le PCM à un nombre d'échantillons (reprise : le décodage est rejoué)"""
+        self._pcm.flush()
+        self._pcm.truncate(samples * 4)
+        self._pcm.seek(samples * 4)
+
+    def close(self):
+        """Ferme les fichiers ; le spool reste sur disque pour une reprise"""
+        for f in (self._webm, self._pcm):
+            if not f.closed:
+                f.close()
+
+    def delete(self):
+        """Supprime le spool (session terminée)"""
+        self.close()
+        for path in (self.webm_path, self.pcm_path):
+            path.unlink(missing_ok=True)
+
+
+def purge_stale_spools(root: Path = None, ttl_hours: Optional[float] = None) -> int:
+    """
+    Supprime les spools des sessions interrompues depuis plus de AUDIO_SPOOL_TTL_HOURS heures
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    root = Path(root or spool_dir())
+    ttl = (SPOOL_TTL_HOURS if ttl_hours is None else ttl_hours) * 3600
+    if not root.exists():
+        return 0
+    removed = 0
+    limit = time.time() - ttl
+    for path in root.glob("*.*"):
+        if path.suffix in (".webm", ".pcm") and path.stat().st_mtime < limit:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import openai
+
+
+# Pause imposée à une route après une erreur de disponibilité (secondes)
+RATE_LIMIT_COOLDOWN = 30.0
+UNAVAILABLE_COOLDOWN = 15.0
+ERROR_RATE_THRESHOLD = 0.5  # Au-delà, la route est considérée comme dégradée
+
+
+def failover_cooldown(error: Exception) -> Optional[float]:
+    """
+    Indique si une erreur justifie de basculer vers un autre provider
+
+    Returns:
+        Durée de mise à l'écart de la route (limite de requêtes, timeout, connexion,
+        erreur serveur), ou None si l'erreur ne dépend pas du provider (requête invalide...)
+    """
+    if isinstance(error, openai.RateLimitError):
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        try:
+            return max(1.0, float(retry_after))
+        except (TypeError, ValueError):
+            return RATE_LIMIT_COOLDOWN
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return UNAVAILABLE_COOLDOWN
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return UNAVAILABLE_COOLDOWN
+    return None
+
+
+class RouteStats:
+    """Latence et taux d'erreur glissants d'un couple provider/modèle"""
+
+    def __init__(self, window: int = 20):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = succès
+        self.cooldown_until = 0.0
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Latence moyenne de réponse (None tant que la route n'a pas été utilisée)"""
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.cooldown_until and self.error_rate < ERROR_RATE_THRESHOLD
+
+
+class LLMRouter:
+    """
+    Choix du provider pour chaque requête LLM
+
+    Les providers configurés sont classés par niveau (cloud d'abord, Ollama local en
+    dernier recours). Pour un modèle demandé, les routes qui le servent sont essayées de la
+    plus rapide à la plus lente parmi les routes saines, puis le modèle par défaut des autres
+    providers. Une route en échec (limite de requêtes, timeout) est écartée temporairement.
+    """
+
+    def __init__(self, endpoints: list):
+        """
+        Args:
+            endpoints: Providers configurés (attributs provider, models, tier)
+        """
+        self.endpoints = endpoints
+        self._stats: dict = {}
+        self._lock = threading.Lock()
+
+    def _route_stats(self, endpoint, model: str) -> RouteStats:
+        key = (endpoint.provider.value, model)
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = RouteStats()
+            return self._stats[key]
+
+    def routes(self, model: str) -> list[tuple]:
+        """Routes (endpoint, modèle) à essayer dans l'ordre pour un modèle demandé"""
+        def rank(route, prefer_tier: bool):
+            endpoint, route_model = route
+            stats = self._route_stats(endpoint, route_model)
+            # Une route jamais utilisée est essayée en priorité pour mesurer sa latence
+            latency = stats.latency or 0.0
+            if prefer_tier:
+                return (not stats.healthy, endpoint.tier, latency)
+            return (not stats.healthy, latency, endpoint.tier)
+
+        direct = [(e, model) for e in self.endpoints if model in e.models]
+        fallbacks = [(e, e.models[0]) for e in self.endpoints if e.models and model not in e.models]
+        return (
+            sorted(direct, key=lambda r: rank(r, prefer_tier=False))
+            + sorted(fallbacks, key=lambda r: rank(r, prefer_tier=True))
+        )
+
+    def record_success(self, endpoint, model: str, latency: float):
+        stats = self._route_stats(endpoint, model)
+        with self._lock:
+            stats.latencies.append(latency)
+            stats.outcomes.append(True)
+
+    def record_failure(self, endpoint, model: str, cooldown: Optional[float] = None):
+        stats = self._route_stats(endpoint, model)
+        with self._lock:
+            stats.outcomes.append(False)
+            if cooldown:
+                stats.cooldown_until = max(stats.cooldown_until, time.monotonic() + cooldown)
+
+    def stats(self) -> list[dict]:
+        """État de chaque route utilisée depuis le démarrage"""
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._stats.items())
+        return [
+            {
+                "provider": provider,
+                "model": model,
+                "healthy": stats.healthy,
+                "latency_ms": round(stats.latency * 1000) if stats.latency is not None else None,
+                "error_rate": round(stats.error_rate, 2),
+                "cooldown_s": round(max(0.0, stats.cooldown_until - now), 1),
+            }
+            for (provider, model), stats in items
+        ]
@@ -1,8 +1,36 @@
-import os
-from openai import OpenAI
-from typing import Optional, List
+import asyncio
+import time
+from collections import deque
+import httpx
+import openai
+from openai import AsyncOpenAI
+from typing import AsyncIterator, Optional, List
 from enum import Enum
 
+from app.config import Settings, get_settings
+from app.services.llm_router import LLMRouter, failover_cooldown
+from app.services.llm_warmup import OllamaWarmer
+from app.services.rate_limiter import COMPLETION_RESERVE_TOKENS, RateLimiter, RateLimiterRegistry
+from app.services.text_chunker import estimate_tokens, split_text
+
+
+# Configuration (backend/.env) : voir app/config.py. Les réglages LLM_* et OLLAMA_* sont
+# relus à chaque reconstruction du service (rechargement à chaud de la configuration)
+LLM_TIMEOUT_SECONDS = 300.0  # Aligné sur le timeout de 5 minutes du frontend
+
+# Paramètres de génération du compte rendu final
+SUMMARY_TEMPERATURE = 0.7
+SUMMARY_MAX_TOKENS = 4096
+
+SYSTEM_PROMPT = "Tu es un assistant expert dans la rédaction de comptes rendus de réunions. Tu génères des comptes rendus clairs, structurés et professionnels en français."
+
+MAP_PROMPT = (
+    "Voici la partie {index}/{count} de la transcription d'une réunion. "
+    "Résume-la fidèlement en français : sujets abordés, informations importantes, "
+    "décisions prises, actions à mener (avec les responsables et échéances mentionnés) "
+    "et questions restées ouvertes. N'invente rien et ne rédige pas de conclusion générale."
+)
+
 
 class LLMProvider(str, Enum):
     """Enum pour les différents providers LLM"""
@@ -11,81 +39,222 @@ class LLMProvider(str, Enum):
     VERCEL = "vercel"
 
 
+# Modèles par défaut de chaque provider (si LLM_MODELS n'est pas défini)
+DEFAULT_MODELS = {
+    LLMProvider.GROQ: [
+        "openai/gpt-oss-20b",
+        "llama-3.3-70b-versatile",
+        "qwen/qwen3-32b"
+    ],
+    LLMProvider.VERCEL: [
+        "openai/gpt-oss-20b",
+        "alibaba/qwen-3-30b",
+        "google/gemini-2.0-flash-lite",
+        "meta/llama-4-scout"
+    ],
+    LLMProvider.OLLAMA: ["llama3.2:3b"],
+}
+
+
+def _parse_models(value: Optional[str]) -> List[str]:
+    """Liste de modèles séparés par des virgules"""
+    return [m.strip() for m in (value or "").split(",") if m.strip()]
+
+
+def _pooled_http_client(settings: Settings) -> httpx.AsyncClient:
+    """
+    Client HTTP asynchrone avec un pool de connexions borné et persistant : les générations
+    concurrentes consomment des sockets (réutilisées en keep-alive), pas des threads
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_connections,
+            keepalive_expiry=settings.llm_keepalive_seconds,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+    )
+
+
+class ProviderEndpoint:
+    """Provider configuré : clients OpenAI-compatibles et modèles servis"""
+    
+    def __init__(
+        self,
+        provider: LLMProvider,
+        config: dict,
+        models: List[str],
+        tier: int,
+        settings: Settings,
+        fallback_only: bool = False,
+    ):
+        """
+        Args:
+            provider: Provider LLM
+            config: Paramètres de connexion (api_key, base_url)
+            models: Modèles servis par ce provider
+            tier: Niveau de priorité (0 = provider principal)
+            settings: Configuration (taille du pool de connexions)
+            fallback_only: Provider de dernier recours, ses modèles ne sont pas proposés
+        """
+        self.provider = provider
+        self.models = models
+        self.tier = tier
+        self.fallback_only = fallback_only
+        self.async_client = AsyncOpenAI(**config, http_client=_pooled_http_client(settings))
+
+
 class LLMService:
     """
     Service unifié pour gérer les différents providers LLM (Ollama, Groq, Vercel)
-    Détecte automatiquement le provider via les variables d'environnement
+    
+    Tous les providers configurés (backend/.env ou variables d'environnement) sont utilisés :
+    chaque requête est envoyée au plus rapide des providers sains servant le modèle demandé,
+    avec bascule automatique sur les autres en cas de limite de requêtes ou d'indisponibilité.
     """
     
-    def __init__(self):
-        # Détecter le provider
-        self.provider = self._detect_provider()
-        self.client = self._create_client()
+    def __init__(self, settings: Optional[Settings] = None, previous: Optional["LLMService"] = None):
+        """
+        Args:
+            settings: Configuration à utiliser. Si None, configuration courante de l'application
+            previous: Service remplacé (rechargement à chaud), dont les limiteurs de débit
+                      inchangés sont conservés
+        """
+        self.settings = settings or get_settings()
+        self.endpoints = self._create_endpoints()
+        self.router = LLMRouter(self.endpoints)
+        # Limiteurs de débit (requêtes et tokens par minute) de chaque provider/modèle
+        self.rate_limits = RateLimiterRegistry(
+            self.settings, previous.rate_limits if previous is not None else None
+        )
+        for endpoint in self.endpoints:
+            for model in endpoint.models:
+                self.rate_limits.get(endpoint.provider.value, model)
+        # Provider principal (affiché dans l'interface)
+        self.provider = self.endpoints[0].provider
+        self.async_client = self.endpoints[0].async_client
         self.available_models = self._get_available_models()
+        # Latences des dernières générations en streaming (temps jusqu'au premier token)
+        self.latency_history = deque(maxlen=100)
+        self.warmer = self._create_warmer()
         
         print(f"Provider LLM détecté: {self.provider.value}")
+        if len(self.endpoints) > 1:
+            print(f"Providers de secours: {', '.join(e.provider.value for e in self.endpoints[1:])}")
         print(f"Modèles disponibles: {', '.join(self.available_models)}")
     
-    def _detect_provider(self) -> LLMProvider:
-        """Détecte le provider à utiliser selon les variables d'environnement"""
-        if os.getenv("GROQ_API_KEY"):
-            return LLMProvider.GROQ
-        elif os.getenv("AI_GATEWAY_API_KEY"):
-            return LLMProvider.VERCEL
-        else:
-            return LLMProvider.OLLAMA
+    def _detect_providers(self) -> List[LLMProvider]:
+        """Détecte les providers configurés, par priorité"""
+        providers = []
+        if self.settings.groq_api_key:
+            providers.append(LLMProvider.GROQ)
+        if self.settings.ai_gateway_api_key:
+            providers.append(LLMProvider.VERCEL)
+        # Ollama (toujours lancé par docker-compose) sert de dernier recours quand un
+        # provider cloud est indisponible (LLM_OLLAMA_FALLBACK=0 pour désactiver)
+        if not providers or self.settings.llm_ollama_fallback:
+            providers.append(LLMProvider.OLLAMA)
+        return providers
     
-    def _create_client(self) -> OpenAI:
-        """Crée le client OpenAI approprié selon le provider"""
-        if self.provider == LLMProvider.GROQ:
-            api_key = os.getenv("GROQ_API_KEY")
+    def _client_config(self, provider: LLMProvider) -> dict:
+        """Paramètres de connexion (clé API, URL) d'un provider"""
+        if provider == LLMProvider.GROQ:
+            api_key = self.settings.groq_api_key
             base_url = "https://api.groq.com/openai/v1"
-            return OpenAI(api_key=api_key, base_url=base_url)
+            return {"api_key": api_key, "base_url": base_url}
         
-        elif self.provider == LLMProvider.VERCEL:
-            api_key = os.getenv("AI_GATEWAY_API_KEY")
+        elif provider == LLMProvider.VERCEL:
+            api_key = self.settings.ai_gateway_api_key
             base_url = "https://ai-gateway.vercel.sh/v1"
-            return OpenAI(api_key=api_key, base_url=base_url)
+            return {"api_key": api_key, "base_url": base_url}
         
         else:  # OLLAMA
-            base_url = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
+            base_url = self.settings.ollama_base_url
             # S'assurer que l'URL se termine par /v1 pour l'API OpenAI-compatible d'Ollama
             if not base_url.endswith("/v1"):
                 base_url = base_url.rstrip("/") + "/v1"
             # Ollama n'utilise pas de clé API, mais le client OpenAI en requiert une
-            api_key = os.getenv("OLLAMA_API_KEY", "not-needed")
-            return OpenAI(base_url=base_url, api_key=api_key)
+            api_key = self.settings.ollama_api_key
+            return {"api_key": api_key, "base_url": base_url}
+    
+    def _provider_models(self, provider: LLMProvider, primary: bool) -> List[str]:
+        """
+        Modèles servis par un provider
+        
+        GROQ_MODELS, VERCEL_MODELS ou OLLAMA_MODELS s'ils sont définis, sinon LLM_MODELS
+        pour le provider principal, sinon les modèles par défaut du provider.
+        """
+        models = _parse_models(getattr(self.settings, f"{provider.value}_models"))
+        if not models and primary:
+            models = _parse_models(self.settings.llm_models)
+        return models or list(DEFAULT_MODELS[provider])
+    
+    def _create_endpoints(self) -> List[ProviderEndpoint]:
+        """Crée les clients de chaque provider configuré"""
+        providers = self._detect_providers()
+        return [
+            ProviderEndpoint(
+                provider,
+                self._client_config(provider),
+                self._provider_models(provider, primary=tier == 0),
+                tier,
+                self.settings,
+                # Ollama en secours d'un provider cloud : ses modèles ne sont pas proposés
+                fallback_only=tier > 0 and provider == LLMProvider.OLLAMA,
+            )
+            for tier, provider in enumerate(providers)
+        ]
+    
+    def _create_warmer(self) -> Optional[OllamaWarmer]:
+        """
+        Préchargement des modèles Ollama selon OLLAMA_WARMUP : "auto" (si Ollama est le
+        provider principal), "1" (toujours, y compris en secours) ou "0"
+        """
+        warmup = self.settings.ollama_warmup
+        endpoint = next((e for e in self.endpoints if e.provider == LLMProvider.OLLAMA), None)
+        if endpoint is None or warmup == "0":
+            return None
+        if warmup == "auto" and endpoint.fallback_only:
+            return None
+        return OllamaWarmer(
+            self._client_config(LLMProvider.OLLAMA)["base_url"],
+            endpoint.models,
+            keep_alive=self.settings.ollama_keep_alive,
+            interval=self.settings.ollama_warmup_interval,
+        )
+    
+    def start_warmup(self):
+        """Lance le préchargement des modèles locaux (à appeler dans la boucle d'événements)"""
+        if self.warmer is not None:
+            self.warmer.start()
+    
+    def get_model_states(self) -> dict:
+        """État de chargement (warm/cold) des modèles locaux ; les modèles cloud n'en ont pas"""
+        return self.warmer.states() if self.warmer is not None else {}
     
     def _get_available_models(self) -> List[str]:
-        """Récupère la liste des modèles disponibles selon le provider"""
-        # Si LLM_MODELS est défini, utiliser cette liste
-        llm_models_env = os.getenv("LLM_MODELS")
-        if llm_models_env:
-            models = [m.strip() for m in llm_models_env.split(",") if m.strip()]
-            if models:
-                return models
-        
-        # Sinon, utiliser les modèles par défaut selon le provider
-        if self.provider == LLMProvider.GROQ:
-            return [
-                "openai/gpt-oss-20b",
-                "llama-3.3-70b-versatile",
-                "qwen/qwen3-32b"
-            ]
-        elif self.provider == LLMProvider.VERCEL:
-            return [
-                "openai/gpt-oss-20b",
-                "alibaba/qwen-3-30b",
-                "google/gemini-2.0-flash-lite",
-                "meta/llama-4-scout"
-            ]
-        else:  # OLLAMA
-            return ["llama3.2:3b"]
+        """Modèles proposés : ceux des providers configurés, sans doublon"""
+        models = []
+        for endpoint in self.endpoints:
+            if endpoint.fallback_only:
+                continue
+            models.extend(m for m in endpoint.models if m not in models)
+        return models
     
     def get_provider(self) -> LLMProvider:
-        """Retourne le provider actuel"""
+        """Retourne le provider principal"""
         return self.provider
     
+    def generation_params(self) -> dict:
+        """Paramètres influant sur le compte rendu généré (pour la clé du cache)"""
+        return {
+            "provider": self.provider.value,
+            "system_prompt": SYSTEM_PROMPT,
+            "temperature": SUMMARY_TEMPERATURE,
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "chunk_tokens": self.settings.llm_chunk_tokens,
+        }
+    
     def get_available_models(self) -> List[str]:
         """Retourne la liste des modèles disponibles"""
         return self.available_models
@@ -94,18 +263,16 @@ class LLMService:
         """Vérifie si un modèle est disponible"""
         return model in self.available_models
     
-    def generate_summary(self, prompt: str, transcription: str, model: Optional[str] = None) -> str:
-        """
-        Génère un compte rendu à partir d'un prompt et d'une transcription
-        
-        Args:
-            prompt: Le prompt système pour guider la génération
-            transcription: La transcription de la réunion
-            model: Le modèle à utiliser. Si None, utilise le premier modèle disponible
-        
-        Returns:
-            Le compte rendu généré
-        """
+    def get_rate_limit_budgets(self) -> List[dict]:
+        """Budget de débit disponible de chaque provider/modèle limité"""
+        return self.rate_limits.budgets()
+    
+    def get_routing_stats(self) -> List[dict]:
+        """Latence et taux d'erreur de chaque couple provider/modèle utilisé"""
+        return self.router.stats()
+    
+    def _resolve_model(self, model: Optional[str]) -> str:
+        """Retourne le modèle à utiliser (modèle par défaut si None) après vérification"""
         # Utiliser le modèle par défaut si non spécifié
         if model is None:
             model = self.available_models[0] if self.available_models else None
@@ -119,78 +286,385 @@ class LLMService:
                 f"Modèle '{model}' non disponible. "
                 f"Modèles disponibles: {', '.join(self.available_models)}"
             )
+        return model
+    
+    def _build_messages(self, prompt: str, transcription: str, condensed: bool = False) -> List[dict]:
+        """
+        Construit les messages envoyés au modèle
         
-        try:
-            full_prompt = f"{prompt}\n\nTranscription de la réunion:\n\n{transcription}\n\nGénère le compte rendu demandé:"
-            
-            print(f"Appel à {self.provider.value} avec le modèle {model}...")
-            print(f"Longueur du prompt: {len(prompt)} caractères")
-            print(f"Longueur de la transcription: {len(transcription)} caractères")
-            
-            # Pour Groq, l'API est légèrement différente (chat.completions.create)
-            # Pour Vercel et Ollama, c'est la même API
-            completion = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Tu es un assistant expert dans la rédaction de comptes rendus de réunions. Tu génères des comptes rendus clairs, structurés et professionnels en français.",
-                    },
-                    {
-                        "role": "user",
-                        "content": full_prompt,
-                    },
-                ],
-                temperature=0.7,
-                max_tokens=4096,
+        Args:
+            condensed: La transcription a été remplacée par les résumés successifs de ses parties
+        """
+        if condensed:
+            full_prompt = (
+                f"{prompt}\n\nLa réunion étant longue, sa transcription a été résumée partie par partie. "
+                f"Résumés des parties, dans l'ordre chronologique:\n\n{transcription}\n\nGénère le compte rendu demandé:"
             )
+        else:
+            full_prompt = f"{prompt}\n\nTranscription de la réunion:\n\n{transcription}\n\nGénère le compte rendu demandé:"
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": full_prompt,
+            },
+        ]
+    
+    @staticmethod
+    def _request_tokens(messages: List[dict], max_tokens: int) -> int:
+        """Tokens estimés d'une requête : prompt et part réservée pour la réponse"""
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        return prompt_tokens + min(max_tokens, COMPLETION_RESERVE_TOKENS)
+    
+    def _route_limiter(self, endpoint: ProviderEndpoint, model: str, tokens: int, is_last: bool) -> Optional[RateLimiter]:
+        """
+        Limiteur de débit de la route, ou None si son attente est trop longue et qu'une
+        autre route peut être essayée
+        """
+        limiter = self.rate_limits.get(endpoint.provider.value, model)
+        wait = limiter.estimated_wait(tokens)
+        # Attente trop longue : basculer sur le provider suivant (le dernier est toujours attendu)
+        if wait > self.settings.llm_rate_limit_max_wait and not is_last:
+            print(f"⏳ Budget de {endpoint.provider.value} ({model}) épuisé ({wait:.0f}s d'attente). Bascule vers le provider suivant...")
+            return None
+        if wait > 0:
+            print(f"⏳ Attente du budget de {endpoint.provider.value} ({model}): ~{wait:.0f}s")
+        return limiter
+    
+    @staticmethod
+    def _used_tokens(completion) -> Optional[int]:
+        usage = getattr(completion, "usage", None)
+        return getattr(usage, "total_tokens", None)
+    
+    def _on_route_error(self, endpoint: ProviderEndpoint, model: str, error: Exception, is_last: bool, failures: list):
+        """
+        Enregistre l'échec d'une route, puis lève l'erreur traduite si aucune bascule n'est possible
 
-            if not completion.choices or not completion.choices[0].message.content:
-                raise Exception(f"Réponse vide de {self.provider.value}")
-            
-            result = completion.choices[0].message.content
-            print(f"Compte rendu généré avec succès ({len(result)} caractères)")
-            return result
-            
-        except Exception as e:
-            import traceback
-            error_details = traceback.format_exc()
-            print(f"Erreur détaillée {self.provider.value}: {error_details}")
-            
-            error_str = str(e).lower()
-            provider_name = self.provider.value.capitalize()
-            
-            # Vérifier différents types d'erreurs
-            if "connection" in error_str or "connect" in error_str or "timeout" in error_str:
-                raise Exception(
-                    f"Impossible de se connecter à {provider_name}. "
-                    f"Vérifiez votre connexion internet et que le service est accessible."
-                )
-            elif "api key" in error_str or "authentication" in error_str or "unauthorized" in error_str or "401" in error_str:
-                raise Exception(
-                    f"Clé API {provider_name} invalide ou expirée. "
-                    f"Vérifiez votre clé API dans backend/.env et relancez start.sh pour la mettre à jour."
-                )
-            elif "model" in error_str and ("not found" in error_str or "invalid" in error_str or "not available" in error_str):
-                raise Exception(
-                    f"Modèle '{model}' non disponible sur {provider_name}. "
-                    f"Modèles disponibles: {', '.join(self.available_models)}. "
-                    f"Relancez start.sh pour sélectionner un autre modèle."
-                )
-            elif "rate limit" in error_str or "429" in error_str:
-                raise Exception(
-                    f"Limite de requêtes atteinte pour {provider_name}. "
-                    f"Veuillez réessayer dans quelques instants."
+        Quand toutes les routes ont échoué, l'erreur levée est celle de la première route
+        (la cause réelle, ex. limite Groq) et non celle du dernier recours (ex. Ollama absent).
+        """
+        if isinstance(error, openai.RateLimitError):
+            self.rate_limits.get(endpoint.provider.value, model).exhaust()
+        cooldown = failover_cooldown(error)
+        self.router.record_failure(endpoint, model, cooldown)
+        if cooldown is None and not failures:
+            raise self._translate_error(error, model, endpoint.provider)
+        failures.append((error, model, endpoint.provider))
+        if cooldown is None or is_last:
+            self._raise_first_failure(failures)
+        print(f"⚠️ {endpoint.provider.value} ({model}) indisponible: {error}. Bascule vers le provider suivant...")
+    
+    def _raise_first_failure(self, failures: list):
+        """Toutes les routes ont échoué : lève l'erreur de la première route essayée"""
+        if not failures:
+            raise Exception("Aucun provider LLM disponible")
+        error, model, provider = failures[0]
+        if len(failures) > 1:
+            print(f"⚠️ Toutes les routes ont échoué, erreur de {provider.value} ({model}) retournée")
+        raise self._translate_error(error, model, provider) from failures[-1][0]
+
+    @staticmethod
+    def _route_client(client, is_last: bool):
+        # Sans la dernière route, pas de nouvel essai du client OpenAI : on bascule directement
+        return client if is_last else client.with_options(max_retries=0)
+    
+    async def _acomplete(self, model: str, messages: List[dict], temperature: float, max_tokens: int, route: Optional[dict] = None) -> str:
+        """Appel asynchrone routé (provider le plus rapide, bascule en cas d'échec)"""
+        routes = self.router.routes(model)
+        tokens = self._request_tokens(messages, max_tokens)
+        failures: list = []  # Échecs des routes déjà essayées (erreur, modèle, provider)
+        for index, (endpoint, route_model) in enumerate(routes):
+            is_last = index == len(routes) - 1
+            limiter = self._route_limiter(endpoint, route_model, tokens, is_last)
+            if limiter is None:
+                continue
+            await limiter.acquire(tokens)
+            client = self._route_client(endpoint.async_client, is_last)
+            start = time.perf_counter()
+            try:
+                completion = await client.chat.completions.create(
+                    model=route_model, messages=messages, temperature=temperature, max_tokens=max_tokens
                 )
-            elif "quota" in error_str or "billing" in error_str:
-                raise Exception(
-                    f"Quota dépassé pour {provider_name}. "
-                    f"Vérifiez votre compte et votre facturation."
+            except Exception as e:
+                self._on_route_error(endpoint, route_model, e, is_last, failures)
+                continue
+            self.router.record_success(endpoint, route_model, time.perf_counter() - start)
+            limiter.settle(tokens, self._used_tokens(completion))
+            if not completion.choices or not completion.choices[0].message.content:
+                raise Exception(f"Réponse vide de {endpoint.provider.value}")
+            if route is not None:
+                route.update(provider=endpoint.provider.value, model=route_model)
+            return completion.choices[0].message.content
+        self._raise_first_failure(failures)
+    
+    async def _astream(self, model: str, messages: List[dict], route: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        Streaming routé : la bascule vers un autre provider n'est possible qu'avant le
+        premier token reçu
+        """
+        routes = self.router.routes(model)
+        tokens = self._request_tokens(messages, SUMMARY_MAX_TOKENS)
+        failures: list = []  # Échecs des routes déjà essayées (erreur, modèle, provider)
+        for index, (endpoint, route_model) in enumerate(routes):
+            is_last = index == len(routes) - 1
+            limiter = self._route_limiter(endpoint, route_model, tokens, is_last)
+            if limiter is None:
+                continue
+            await limiter.acquire(tokens)
+            client = self._route_client(endpoint.async_client, is_last)
+            start = time.perf_counter()
+            started = False
+            try:
+                stream = await client.chat.completions.create(
+                    model=route_model,
+                    messages=messages,
+                    temperature=SUMMARY_TEMPERATURE,
+                    max_tokens=SUMMARY_MAX_TOKENS,
+                    stream=True,
                 )
-            else:
-                # Erreur générique avec plus de détails
-                error_message = str(e)
-                # Limiter la longueur du message d'erreur
-                if len(error_message) > 200:
-                    error_message = error_message[:200] + "..."
-                raise Exception(f"Erreur {provider_name}: {error_message}")
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        if not started:
+                            started = True
+                            self.router.record_success(endpoint, route_model, time.perf_counter() - start)
+                            if route is not None:
+                                route.update(provider=endpoint.provider.value, model=route_model)
+                        yield delta
+                finally:
+                    # Fermer la connexion si le client s'est déconnecté en cours de génération
+                    await stream.close()
+            except GeneratorExit:
+                raise
+            except Exception as e:
+                if started:
+                    self.router.record_failure(endpoint, route_model)
+                    raise self._translate_error(e, route_model, endpoint.provider)
+                self._on_route_error(endpoint, route_model, e, is_last, failures)
+                continue
+            if not started:
+                raise Exception(f"Réponse vide de {endpoint.provider.value}")
+            return
+        self._raise_first_failure(failures)
+    
+    async def _summarize_part(
+        self, model: str, part: str, index: int, count: int, semaphore: asyncio.Semaphore
+    ) -> str:
+        """Résume une partie de la transcription (étape map)"""
+        async with semaphore:
+            summary = await self._acomplete(
+                model,
+                [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{MAP_PROMPT.format(index=index, count=count)}\n\n{part}"},
+                ],
+                temperature=0.3,
+                max_tokens=1024,
+            )
+        return summary.strip()
+    
+    async def _condense(self, transcription: str, model: str) -> tuple[str, int]:
+        """
+        Réduit une longue transcription à ses résumés partiels (étape map)
+        
+        Au-delà de LLM_CHUNK_TOKENS tokens estimés (0 = désactivé), la transcription est
+        découpée en morceaux résumés en parallèle (au plus LLM_MAP_CONCURRENCY à la fois) ;
+        si les résumés dépassent encore le budget,
+        ils sont à leur tour regroupés et résumés (réduction hiérarchique).
+        
+        Returns:
+            (texte à passer au prompt final, nombre de morceaux résumés ; 0 si la
+            transcription tient dans le budget)
+        """
+        chunk_tokens = self.settings.llm_chunk_tokens
+        concurrency = self.settings.llm_map_concurrency
+        if chunk_tokens <= 0:
+            return transcription, 0
+        
+        text = transcription
+        summarized = 0
+        semaphore = asyncio.Semaphore(concurrency)
+        while estimate_tokens(text) > chunk_tokens:
+            parts = split_text(text, chunk_tokens)
+            if len(parts) < 2 and summarized:
+                break  # Résumé partiel unique : inutile de le résumer à nouveau
+            print(f"Résumé hiérarchique: {len(parts)} partie(s), {concurrency} en parallèle...")
+            start = time.perf_counter()
+            summaries = await asyncio.gather(*(
+                self._summarize_part(model, part, index, len(parts), semaphore)
+                for index, part in enumerate(parts, start=1)
+            ))
+            print(f"Parties résumées en {time.perf_counter() - start:.1f}s")
+            summarized += len(parts)
+            condensed = "\n\n".join(
+                f"Partie {index}:\n{summary}" for index, summary in enumerate(summaries, start=1)
+            )
+            if len(condensed) >= len(text):
+                break  # Les résumés ne raccourcissent plus le texte (budget trop faible)
+            text = condensed
+        return text, summarized
+    
+    async def agenerate_summary(
+        self,
+        prompt: str,
+        transcription: str,
+        model: Optional[str] = None,
+        route: Optional[dict] = None,
+    ) -> str:
+        """
+        Génère un compte rendu à partir d'un prompt et d'une transcription (client AsyncOpenAI partagé)
+        
+        Les transcriptions trop longues pour un seul appel sont d'abord résumées par
+        parties (voir LLM_CHUNK_TOKENS).
+        
+        Args:
+            prompt: Le prompt système pour guider la génération
+            transcription: La transcription de la réunion
+            model: Le modèle à utiliser. Si None, utilise le premier modèle disponible
+            route: Dictionnaire optionnel complété avec le provider et le modèle ayant
+                généré le compte rendu (différents du modèle demandé après une bascule)
+        
+        Returns:
+            Le compte rendu généré
+        """
+        model = self._resolve_model(model)
+        
+        print(f"Génération du compte rendu avec le modèle {model}...")
+        print(f"Longueur de la transcription: {len(transcription)} caractères")
+        
+        text, parts = await self._condense(transcription, model)
+        result = await self._acomplete(
+            model,
+            self._build_messages(prompt, text, condensed=parts > 0),
+            temperature=SUMMARY_TEMPERATURE,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            route=route,
+        )
+        print(f"Compte rendu généré avec succès ({len(result)} caractères)")
+        return result
+    
+    async def stream_summary(
+        self,
+        prompt: str,
+        transcription: str,
+        model: Optional[str] = None,
+        metrics: Optional[dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Génère un compte rendu en streaming, fragment de texte par fragment de texte
+        
+        Args:
+            prompt: Le prompt système pour guider la génération
+            transcription: La transcription de la réunion
+            model: Le modèle à utiliser. Si None, utilise le premier modèle disponible
+            metrics: Dictionnaire optionnel complété en fin de génération
+                (provider, model, ttft_ms, total_ms, characters, parts)
+        
+        Yields:
+            Les fragments du compte rendu, dès leur réception
+        """
+        model = self._resolve_model(model)
+        
+        print(f"Génération du compte rendu avec le modèle {model} (streaming)...")
+        print(f"Longueur de la transcription: {len(transcription)} caractères")
+        
+        start = time.perf_counter()
+        ttft = None
+        characters = 0
+        route = {}
+        text, parts = await self._condense(transcription, model)
+        async for delta in self._astream(model, self._build_messages(prompt, text, condensed=parts > 0), route):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+                print(f"Premier token reçu en {ttft * 1000:.0f} ms ({route['provider']})")
+            characters += len(delta)
+            yield delta
+        
+        total = time.perf_counter() - start
+        print(f"Compte rendu généré avec succès ({characters} caractères, {total:.1f}s)")
+        record = self._record_latency(route["provider"], route["model"], ttft, total, characters)
+        if metrics is not None:
+            metrics.update(record, parts=parts)
+    
+    async def aclose(self):
+        """Ferme les connexions des pools asynchrones"""
+        if self.warmer is not None:
+            await self.warmer.stop()
+        for endpoint in self.endpoints:
+            await endpoint.async_client.close()
+    
+    def _record_latency(self, provider: str, model: str, ttft: float, total: float, characters: int) -> dict:
+        """Enregistre la latence d'une génération en streaming"""
+        record = {
+            "provider": provider,
+            "model": model,
+            "ttft_ms": round(ttft * 1000),
+            "total_ms": round(total * 1000),
+            "characters": characters,
+        }
+        self.latency_history.append(record)
+        return record
+    
+    def get_latency_stats(self) -> dict:
+        """Statistiques de temps jusqu'au premier token sur les dernières générations"""
+        ttfts = sorted(record["ttft_ms"] for record in self.latency_history)
+        if not ttfts:
+            return {"count": 0, "ttft_p50_ms": None, "ttft_p95_ms": None, "recent": []}
+        return {
+            "count": len(ttfts),
+            "ttft_p50_ms": ttfts[len(ttfts) // 2],
+            "ttft_p95_ms": ttfts[min(len(ttfts) - 1, int(len(ttfts) * 0.95))],
+            "recent": list(self.latency_history)[-10:],
+        }
+    
+    def _translate_error(self, e: Exception, model: str, provider: Optional[LLMProvider] = None) -> Exception:
+        """Convertit une erreur du provider en message compréhensible pour l'utilisateur"""
+        import traceback
+        provider = provider or self.provider
+        error_details = traceback.format_exc()
+        print(f"Erreur détaillée {provider.value}: {error_details}")
+        
+        error_str = str(e).lower()
+        provider_name = provider.value.capitalize()
+        
+        # Vérifier différents types d'erreurs
+        if "connection" in error_str or "connect" in error_str or "timeout" in error_str:
+            return Exception(
+                f"Impossible de se connecter à {provider_name}. "
+                f"Vérifiez votre connexion internet et que le service est accessible."
+            )
+        elif "api key" in error_str or "authentication" in error_str or "unauthorized" in error_str or "401" in error_str:
+            return Exception(
+                f"Clé API {provider_name} invalide ou expirée. "
+                f"Vérifiez votre clé API dans backend/.env et relancez start.sh pour la mettre à jour."
+            )
+        elif "model" in error_str and ("not found" in error_str or "invalid" in error_str or "not available" in error_str):
+            return Exception(
+                f"Modèle '{model}' non disponible sur {provider_name}. "
+                f"Modèles disponibles: {', '.join(self.available_models)}. "
+                f"Relancez start.sh pour sélectionner un autre modèle."
+            )
+        elif "rate limit" in error_str or "429" in error_str:
+            return Exception(
+                f"Limite de requêtes atteinte pour {provider_name}. "
+                f"Veuillez réessayer dans quelques instants."
+            )
+        elif "quota" in error_str or "billing" in error_str:
+            return Exception(
+                f"Quota dépassé pour {provider_name}. "
+                f"Vérifiez votre compte et votre facturation."
+            )
+        else:
+            # Erreur générique avec plus de détails
+            error_message = str(e)
+            # Limiter la longueur du message d'erreur
+            if len(error_message) > 200:
+                error_message = error_message[:200] + "..."
+            return Exception(f"Erreur {provider_name}: {error_message}")
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+
+WARM = "warm"
+COLD = "cold"
+WARMING = "warming"
+ERROR = "error"
+
+
+class OllamaWarmer:
+    """
+    Préchargement des modèles Ollama et maintien en mémoire
+
+    Au démarrage, chaque modèle est chargé par une requête vide sur l'API native
+    (/api/generate sans prompt), avec un keep_alive configurable. La requête est renouvelée
+    périodiquement pour qu'Ollama n'évince pas le modèle entre deux réunions, et l'état
+    réel des modèles chargés est lu sur /api/ps.
+    """
+
+    def __init__(self, base_url: str, models: list[str], keep_alive: str = "30m", interval: float = 240.0):
+        """
+        Args:
+            base_url: URL d'Ollama (avec ou sans /v1)
+            models: Modèles à garder chargés
+            keep_alive: Durée de maintien en mémoire après chaque requête, au format Ollama
+                (OLLAMA_KEEP_ALIVE)
+            interval: Intervalle de rafraîchissement du keep_alive et de vérification de
+                l'état des modèles, en secondes (OLLAMA_WARMUP_INTERVAL)
+        """
+        base_url = base_url.rstrip("/")
+        if base_url.endswith("/v1"):
+            base_url = base_url[:-3]
+        self.base_url = base_url
+        self.models = models
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self._states = {model: {"state": COLD, "load_ms": None, "warmed_at": None, "error": None} for model in models}
+        self._task: Optional[asyncio.Task] = None
+
+    async def warm_model(self, client: httpx.AsyncClient, model: str):
+        """Charge un modèle en mémoire (ou prolonge son keep_alive s'il l'est déjà)"""
+        state = self._states[model]
+        if state["state"] != WARM:
+            state["state"] = WARMING
+        start = time.perf_counter()
+        try:
+            # Chargement long au premier appel (plusieurs secondes pour un modèle de quelques Go)
+            response = await client.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=300.0,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            state.update(state=ERROR, error=str(e)[:200])
+            print(f"⚠️ Préchargement du modèle Ollama {model} impossible: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        if state["state"] != WARM:
+            print(f"🔥 Modèle Ollama {model} chargé en {elapsed:.1f}s (keep_alive: {self.keep_alive})")
+            state["load_ms"] = round(elapsed * 1000)
+        state.update(state=WARM, warmed_at=time.time(), error=None)
+
+    async def _refresh_states(self, client: httpx.AsyncClient):
+        """Met à jour l'état des modèles selon la liste des modèles chargés par Ollama"""
+        try:
+            response = await client.get(f"{self.base_url}/api/ps", timeout=10.0)
+            response.raise_for_status()
+            running = response.json().get("models", [])
+            loaded = {m.get("name") for m in running} | {m.get("model") for m in running}
+        except Exception as e:
+            print(f"⚠️ État des modèles Ollama indisponible: {e}")
+            return
+        for model, state in self._states.items():
+            if state["state"] == WARM and model not in loaded:
+                print(f"Modèle Ollama {model} évincé de la mémoire, rechargement...")
+                state["state"] = COLD
+
+    async def run(self):
+        """Préchargement initial puis rafraîchissement périodique"""
+        async with httpx.AsyncClient() as client:
+            while True:
+                await self._refresh_states(client)
+                # Les modèles sont chargés l'un après l'autre pour ne pas saturer la mémoire
+                for model in self.models:
+                    await self.warm_model(client, model)
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Démarre le préchargement en tâche de fond (ne bloque pas le démarrage de l'API)"""
+        if self._task is None:
+            print(f"🔥 Préchargement des modèles Ollama: {', '.join(self.models)}")
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def states(self) -> dict:
+        """État de chaque modèle : warm, cold, warming ou error"""
+        return {model: state["state"] for model, state in self._states.items()}
+
+    def status(self) -> dict:
+        """État détaillé de chaque modèle (temps de chargement, dernier rafraîchissement)"""
+        return {model: dict(state) for model, state in self._states.items()}
@@ -0,0 +1,117 @@
+import os
+import re
+
+import numpy as np
+
+from app.services.audio_decoder import SAMPLE_RATE
+from app.services.vad import speech_regions
+
+
+# Au-delà de cette durée (secondes), l'audio est découpé et transcrit en parallèle
+LONG_AUDIO_THRESHOLD = float(os.getenv("LONG_AUDIO_THRESHOLD", "300"))
+# Durée visée de chaque morceau (secondes), ajustée pour couper dans un silence
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "120"))
+# Chevauchement des morceaux coupés en pleine parole (aucun silence trouvé)
+OVERLAP_SECONDS = 2.0
+
+
+def split_at_silences(
+    pcm: np.ndarray,
+    chunk_seconds: float = None,
+    overlap_seconds: float = OVERLAP_SECONDS,
+) -> list[tuple[int, int]]:
+    """
+    Découpe un long audio en morceaux indépendants, aux silences les plus proches de la durée visée
+
+    Chaque coupure est placée au milieu du silence le plus proche de la durée visée (entre la
+    moitié et une fois et demie celle-ci). Sans silence dans cet intervalle, la coupure se fait
+    à la durée visée et les deux morceaux se chevauchent de overlap_seconds pour ne perdre
+    aucun mot ; les doublons sont retirés par stitch_segments.
+
+    Returns:
+        Liste de morceaux (début, fin) en échantillons
+    """
+    chunk = int((chunk_seconds or LONG_AUDIO_CHUNK_SECONDS) * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    if pcm.size <= chunk * 1.5:
+        return [(0, pcm.size)]
+
+    # Milieux des silences entre deux zones de parole : coupures possibles
+    regions = speech_regions(pcm)
+    cut_points = np.array([(end + next_start) // 2 for (_, end), (next_start, _) in zip(regions, regions[1:])])
+
+    chunks = []
+    start = 0
+    while pcm.size - start > chunk * 1.5:
+        target = start + chunk
+        low, high = start + chunk // 2, start + chunk * 3 // 2
+        candidates = cut_points[(cut_points > low) & (cut_points < high)] if cut_points.size else cut_points
+        if candidates.size:
+            cut = int(candidates[np.argmin(np.abs(candidates - target))])
+            chunks.append((start, cut))
+            start = cut
+        else:
+            chunks.append((start, min(pcm.size, target + overlap)))
+            start = target
+    chunks.append((start, pcm.size))
+    return chunks
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+
+def stitch_segments(parts: list[tuple[float, list[dict]]]) -> list[dict]:
+    """
+    Rassemble les segments des morceaux transcrits séparément
+
+    Args:
+        parts: Pour chaque morceau, dans l'ordre : (début du morceau en secondes, segments
+            {"start", "end", "text"} relatifs au morceau)
+
+    Returns:
+        Segments en temps absolu, sans les doublons des zones de chevauchement
+    """
+    stitched: list[dict] = []
+    for offset, segments in parts:
+        for segment in segments:
+            text = segment["text"].strip()
+            if not text:
+                continue
+            absolute = dict(
+                segment, start=round(offset + segment["start"], 2), end=round(offset + segment["end"], 2), text=text
+            )
+            if stitched:
+                previous = stitched[-1]
+                # Zone de chevauchement : segment déjà couvert par le morceau précédent
+                midpoint = (absolute["start"] + absolute["end"]) / 2
+                if midpoint <= previous["end"]:
+                    continue
+                if _normalize(text) and _normalize(text) == _normalize(previous["text"]):
+                    continue
+            stitched.append(absolute)
+    return stitched
+
+
+def transcribe_in_chunks(pcm: np.ndarray, language: str, transcribe_chunks) -> dict:
+    """
+    Transcription d'un long audio : découpage aux silences, transcription des morceaux, assemblage
+
+    Args:
+        pcm: Échantillons float32 mono 16 kHz (éventuellement projetés en mémoire)
+        language: Code langue ("fr", "en" ou None pour auto-détection)
+        transcribe_chunks: Fonction (pcm, morceaux, language) -> segments de chaque morceau,
+            séquentielle ou répartie sur un pool de processus
+
+    Returns:
+        Dictionnaire {"text": texte transcrit complet, "segments": segments en temps absolu}
+    """
+    bounds = split_at_silences(pcm)
+    print(f"Audio long ({pcm.size / SAMPLE_RATE:.0f}s) découpé en {len(bounds)} morceaux aux silences")
+    results = transcribe_chunks(pcm, bounds, language)
+    segments = stitch_segments([(start / SAMPLE_RATE, chunk) for (start, _), chunk in zip(bounds, results)])
+    if not segments:
+        raise ValueError(
+            "Aucune parole détectée dans l'enregistrement. Vérifiez que le microphone fonctionne correctement."
+        )
+    return {"text": " ".join(s["text"] for s in segments), "segments": segments}
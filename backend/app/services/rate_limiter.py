@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+# Limites par défaut par modèle (requêtes/minute, tokens/minute), 0 = illimité.
+# Valeurs de l'offre gratuite de Groq ; Vercel et Ollama ne sont pas limités par défaut.
+DEFAULT_LIMITS = {
+    "groq": (30, 6000),
+    "vercel": (0, 0),
+    "ollama": (0, 0),
+}
+
+# Tokens réservés pour la réponse, ajustés ensuite selon l'usage réel renvoyé par le provider
+COMPLETION_RESERVE_TOKENS = 1024
+
+
+def _parse_overrides(value: Optional[str]) -> dict:
+    """
+    Limites spécifiques à un modèle : "provider:modèle=rpm:tpm" séparés par des virgules
+
+    Exemple : LLM_RATE_LIMITS="groq:llama-3.3-70b-versatile=30:12000,groq:qwen/qwen3-32b=60:6000"
+    """
+    overrides = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        route, limits = item.strip().rsplit("=", 1)
+        provider, _, model = route.partition(":")
+        rpm, _, tpm = limits.partition(":")
+        overrides[(provider, model)] = (int(rpm or 0), int(tpm or 0))
+    return overrides
+
+
+class TokenBucket:
+    """Seau à jetons rechargé en continu (capacité = limite par minute)"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Délai avant que amount jetons soient disponibles (après refill)"""
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)  # Une requête plus grande que la limite passe seule
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimiter:
+    """
+    Limiteur de débit d'un couple provider/modèle : requêtes et tokens par minute
+
+    Les requêtes sont servies dans leur ordre d'arrivée (file FIFO) : une requête attend
+    que le budget soit disponible plutôt que d'échouer avec une erreur 429.
+    """
+
+    def __init__(self, provider: str, model: str, rpm: int, tpm: int):
+        self.provider = provider
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._queue: deque = deque()  # (ticket, tokens) en attente, dans l'ordre d'arrivée
+        self._tickets = itertools.count()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.requests.unlimited and self.tokens.unlimited
+
+    def _wait_time(self, requests: float, tokens: float) -> float:
+        return max(self.requests.wait_time(requests), self.tokens.wait_time(tokens))
+
+    def estimated_wait(self, tokens: int) -> float:
+        """Attente estimée pour une nouvelle requête, file d'attente comprise"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            queued_tokens = sum(t for _, t in self._queue)
+            return self._wait_time(len(self._queue) + 1, queued_tokens + tokens)
+
+    def _try_acquire(self, ticket: int, tokens: int) -> float:
+        """Consomme le budget si la requête est en tête de file, sinon retourne l'attente"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            if self._queue[0][0] != ticket:
+                return 0.05  # Une requête arrivée avant est encore en attente
+            wait = self._wait_time(1, tokens)
+            if wait > 0:
+                return wait
+            self._queue.popleft()
+            if not self.requests.unlimited:
+                self.requests.level -= 1
+            if not self.tokens.unlimited:
+                self.tokens.level -= min(tokens, self.tokens.capacity)
+            return 0.0
+
+    def _enqueue(self, tokens: int) -> int:
+        with self._lock:
+            ticket = next(self._tickets)
+            self._queue.append((ticket, tokens))
+            return ticket
+
+    def _dequeue(self, ticket: int):
+        with self._lock:
+            self._queue = deque(item for item in self._queue if item[0] != ticket)
+
+    async def acquire(self, tokens: int):
+        """Attend (sans bloquer la boucle d'événements) que le budget soit disponible"""
+        if self.unlimited:
+            return
+        ticket = self._enqueue(tokens)
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._dequeue(ticket)  # Requête annulée : libérer sa place dans la file
+            raise
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Corrige le budget de tokens avec l'usage réel renvoyé par le provider"""
+        if used is None or self.tokens.unlimited:
+            return
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+
+    def exhaust(self):
+        """Le provider a répondu 429 : son budget réel est épuisé"""
+        with self._lock:
+            self.requests.level = min(self.requests.level, 0.0)
+            self.tokens.level = min(self.tokens.level, 0.0)
+
+    def budget(self) -> dict:
+        """Budget disponible et file d'attente"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "provider": self.provider,
+                "model": self.model,
+                "requests_per_minute": int(self.requests.capacity) or None,
+                "requests_available": None if self.requests.unlimited else int(max(0.0, self.requests.level)),
+                "tokens_per_minute": int(self.tokens.capacity) or None,
+                "tokens_available": None if self.tokens.unlimited else int(max(0.0, self.tokens.level)),
+                "queued": len(self._queue),
+            }
+
+
+class RateLimiterRegistry:
+    """
+    Limiteurs de chaque couple provider/modèle
+
+    Limites configurables par provider ({PROVIDER}_RPM, {PROVIDER}_TPM, appliquées à chaque
+    modèle) et par modèle (LLM_RATE_LIMITS).
+    """
+
+    def __init__(self, settings, previous: Optional["RateLimiterRegistry"] = None):
+        """
+        Args:
+            settings: Configuration de l'application (app.config.Settings)
+            previous: Registre remplacé (rechargement à chaud) : ses limiteurs dont les limites
+                      n'ont pas changé sont repris, avec leur budget consommé et leur file d'attente
+        """
+        self.settings = settings
+        self._limiters: dict = {}
+        self._lock = threading.Lock()
+        self._overrides = _parse_overrides(settings.llm_rate_limits)
+        if previous is not None:
+            with previous._lock:
+                limiters = list(previous._limiters.items())
+            for key, limiter in limiters:
+                limits = (int(limiter.requests.capacity), int(limiter.tokens.capacity))
+                if limits == self._limits(*key):
+                    self._limiters[key] = limiter
+
+    def _limits(self, provider: str, model: str) -> tuple[int, int]:
+        if (provider, model) in self._overrides:
+            return self._overrides[(provider, model)]
+        default_rpm, default_tpm = DEFAULT_LIMITS.get(provider, (0, 0))
+        rpm = getattr(self.settings, f"{provider}_rpm", None)
+        tpm = getattr(self.settings, f"{provider}_tpm", None)
+        return (
+            default_rpm if rpm is None else rpm,
+            default_tpm if tpm is None else tpm,
+        )
+
+    def get(self, provider: str, model: str) -> RateLimiter:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._limiters:
+                self._limiters[key] = RateLimiter(provider, model, *self._limits(provider, model))
+            return self._limiters[key]
+
+    def budgets(self) -> list[dict]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return [limiter.budget() for limiter in limiters if not limiter.unlimited]
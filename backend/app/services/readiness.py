@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Optional
+
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+ERROR = "error"
+
+
+class Readiness:
+    """
+    État de démarrage des composants de l'application (base de données, modèle Whisper...)
+
+    Les composants lourds sont chargés en tâche de fond : l'API répond immédiatement et
+    chaque composant indique son avancement (étape en cours, durée) jusqu'à être prêt.
+    Partagé entre le thread de chargement et la boucle d'événements.
+    """
+
+    def __init__(self):
+        self._components: dict = {}
+        self._events: dict = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, steps: int = 1):
+        """Déclare un composant à charger en steps étapes"""
+        with self._lock:
+            self._components[name] = {
+                "state": PENDING,
+                "step": None,
+                "progress": 0.0,
+                "steps": steps,
+                "started_at": None,
+                "elapsed_s": None,
+                "error": None,
+            }
+            self._events[name] = threading.Event()
+
+    def step(self, name: str, description: str, index: int = 0):
+        """Le composant commence son étape index (0 pour la première)"""
+        with self._lock:
+            component = self._components[name]
+            if component["started_at"] is None:
+                component["started_at"] = time.monotonic()
+            component.update(state=LOADING, step=description, progress=round(index / component["steps"], 2))
+        print(f"⏳ {name}: {description}")
+
+    def ready(self, name: str):
+        with self._lock:
+            component = self._components[name]
+            component.update(state=READY, step=None, progress=1.0, elapsed_s=self._elapsed(component))
+        self._events[name].set()
+        print(f"✅ {name} prêt ({component['elapsed_s'] or 0:.1f}s)")
+
+    def fail(self, name: str, error: Exception):
+        with self._lock:
+            component = self._components[name]
+            component.update(state=ERROR, error=str(error)[:200], elapsed_s=self._elapsed(component))
+        self._events[name].set()  # Débloquer les attentes : l'erreur est définitive
+        print(f"❌ {name}: échec du chargement: {error}")
+
+    @staticmethod
+    def _elapsed(component: dict) -> Optional[float]:
+        if component["started_at"] is None:
+            return None
+        return round(time.monotonic() - component["started_at"], 1)
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self._components[name]["state"]
+
+    def is_ready(self, name: str = None) -> bool:
+        """Un composant (ou tous si name est None) est prêt"""
+        with self._lock:
+            components = [self._components[name]] if name else self._components.values()
+            return all(c["state"] == READY for c in components)
+
+    def wait(self, name: str, timeout: float = None) -> bool:
+        """Attend (en bloquant) la fin du chargement d'un composant ; True s'il est prêt"""
+        self._events[name].wait(timeout)
+        return self.is_ready(name)
+
+    def status(self) -> dict:
+        """Avancement de chaque composant"""
+        with self._lock:
+            status = {}
+            for name, component in self._components.items():
+                item = {k: v for k, v in component.items() if k != "started_at"}
+                if component["state"] == LOADING:
+                    item["elapsed_s"] = self._elapsed(component)
+                status[name] = item
+            return status
+
+
+# Singleton partagé par l'application
+readiness = Readiness()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from app.services.audio_spool import AudioSpool, purge_stale_spools
+from app.services.streaming_transcriber import StreamingTranscriber
+from app.services.transcription_scheduler import PartialCadence
+
+
+# Durée pendant laquelle une session déconnectée reste en mémoire, prête à être reprise (secondes)
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "900"))
+
+
+class RecordingSession:
+    """
+    État d'une session d'enregistrement, indépendant de la connexion WebSocket
+
+    Conserve le moteur de transcription (décodeur, texte déjà validé, fenêtre en cours),
+    la langue et la cadence des partielles : une reconnexion reprend exactement où la
+    connexion précédente s'est arrêtée.
+    """
+
+    def __init__(self, spool: AudioSpool):
+        self.spool = spool
+        self.transcriber: Optional[StreamingTranscriber] = None
+        self.language = "fr"  # Par défaut français
+        self.cadence = PartialCadence(base_interval=3.0)  # Partielles toutes les 3 secondes, espacées si surcharge
+        self.last_partial_time = time.time()
+        self.chunk_count = 0
+        self.owner = None  # Connexion qui utilise la session (None = déconnectée)
+        self.last_seen = time.monotonic()
+        self.replaying: Optional[asyncio.Future] = None  # Décodage du spool en cours (reprise)
+
+    @property
+    def session_id(self) -> str:
+        return self.spool.session_id
+
+    def get_transcriber(self, whisper_service) -> StreamingTranscriber:
+        """Moteur de la session, créé au premier chunk audio"""
+        if self.transcriber is None:
+            self.transcriber = StreamingTranscriber(whisper_service, self.spool, self.language)
+        return self.transcriber
+
+    def set_language(self, language: str):
+        self.language = language
+        if self.transcriber:
+            self.transcriber.language = language
+
+    def close(self):
+        """Libère le décodeur et ferme les fichiers (le spool reste sur disque)"""
+        if self.transcriber:
+            self.transcriber.close()
+        else:
+            self.spool.close()
+
+
+class SessionRegistry:
+    """
+    Sessions d'enregistrement en cours, y compris celles dont le client s'est déconnecté
+
+    Une session déconnectée sans avoir demandé l'arrêt reste en mémoire pendant
+    SESSION_IDLE_TTL secondes : le client qui se reconnecte avec son identifiant retrouve
+    son texte validé sans aucune retranscription. Passé ce délai, la session est évincée
+    et seul son spool sur disque permet encore une reprise (audio décodé à nouveau).
+    """
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._sessions: dict[str, RecordingSession] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def open(self, session_id: Optional[str], whisper_service, owner) -> tuple[RecordingSession, bool]:
+        """
+        Rattache une connexion à sa session : en mémoire, reprise depuis le spool, ou nouvelle
+
+        Une reprise depuis le spool décode à nouveau l'audio reçu dans un thread, sans bloquer
+        la boucle d'événements ; une connexion concurrente sur la même session attend la fin
+        de ce décodage.
+
+        Args:
+            session_id: Identifiant envoyé par le client pour une reprise (None pour une nouvelle session)
+            whisper_service: Service de transcription utilisé par les sessions reprises depuis le spool
+            owner: Jeton de la connexion ; une connexion plus récente remplace la précédente
+
+        Returns:
+            (session, True si la session est reprise)
+        """
+        self.evict_idle()
+        session = self._sessions.get(session_id) if session_id else None
+        resumed = session is not None
+        if session is None and AudioSpool.exists(session_id):
+            # Session évincée ou serveur redémarré : décoder à nouveau l'audio reçu
+            session = RecordingSession(AudioSpool(session_id))
+            session.replaying = asyncio.ensure_future(
+                asyncio.to_thread(session.get_transcriber(whisper_service).replay)
+            )
+            resumed = True
+        if session is None:
+            session = RecordingSession(AudioSpool.create())
+        self._sessions[session.session_id] = session
+        session.owner = owner
+        session.last_seen = time.monotonic()
+        if session.replaying is not None:
+            # shield : le décodage se poursuit même si cette connexion est interrompue
+            await asyncio.shield(session.replaying)
+        return session, resumed
+
+    def is_owner(self, session: RecordingSession, owner) -> bool:
+        """La connexion utilise toujours la session (pas de reconnexion entre-temps)"""
+        return session.owner is owner
+
+    def release(self, session: RecordingSession, owner, finished: bool):
+        """
+        Fin de connexion : session terminée (spool supprimé) ou conservée pour une reprise
+
+        Sans effet si une connexion plus récente a repris la session.
+        """
+        if not self.is_owner(session, owner):
+            return
+        session.owner = None
+        session.last_seen = time.monotonic()
+        if finished or session.spool.received_bytes == 0:
+            self._sessions.pop(session.session_id, None)
+            session.close()
+            session.spool.delete()
+
+    def evict_idle(self) -> int:
+        """Évince les sessions déconnectées depuis plus de idle_ttl secondes"""
+        limit = time.monotonic() - self.idle_ttl
+        idle = [
+            s for s in self._sessions.values()
+            if s.owner is None and s.last_seen < limit and (s.replaying is None or s.replaying.done())
+        ]
+        for session in idle:
+            del self._sessions[session.session_id]
+            session.close()
+            print(f"Session {session.session_id} évincée après {self.idle_ttl:.0f}s d'inactivité")
+        return len(idle)
+
+    async def run(self, interval: float = 60.0):
+        """Évince les sessions inactives et supprime les spools expirés (AUDIO_SPOOL_TTL_HOURS)"""
+        while True:
+            removed = await asyncio.to_thread(purge_stale_spools)
+            if removed:
+                print(f"🧹 {removed} fichier(s) audio de sessions expirées supprimé(s)")
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def start(self):
+        """Démarre l'éviction et le nettoyage périodiques (à appeler dans la boucle d'événements)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for session in list(self._sessions.values()):
+            session.close()
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        connected = sum(1 for s in self._sessions.values() if s.owner is not None)
+        return {"connected": connected, "detached": len(self._sessions) - connected}
+
+
+# Singleton partagé par l'application
+session_registry = SessionRegistry()
@@ -0,0 +1,304 @@
+import threading
+from typing import Optional
+
+import numpy as np
+
+from app.services.audio_decoder import SAMPLE_RATE, StreamingDecoder
+from app.services.audio_spool import AudioSpool
+from app.services.long_audio import LONG_AUDIO_THRESHOLD
+from app.services.vad import has_speech
+
+
+class PCMRingBuffer:
+    """
+    Buffer circulaire de PCM float32 mono 16 kHz
+
+    Les positions sont exprimées en échantillons absolus depuis le début de la session,
+    ce qui permet de garder des timestamps cohérents même quand l'ancien audio est écrasé.
+    """
+
+    def __init__(self, capacity_seconds: float):
+        self.capacity = int(capacity_seconds * SAMPLE_RATE)
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self.start = 0  # Position absolue du plus ancien échantillon conservé
+        self.end = 0  # Position absolue juste après le dernier échantillon écrit
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def append(self, samples: np.ndarray):
+        """Ajoute des échantillons, en écrasant les plus anciens si le buffer est plein"""
+        if samples.size == 0:
+            return
+        if samples.size > self.capacity:
+            # Seuls les derniers échantillons tiennent dans le buffer
+            self.end += samples.size - self.capacity
+            samples = samples[-self.capacity:]
+
+        offset = self.end % self.capacity
+        first = min(samples.size, self.capacity - offset)
+        self._data[offset:offset + first] = samples[:first]
+        if first < samples.size:
+            self._data[:samples.size - first] = samples[first:]
+        self.end += samples.size
+        self.start = max(self.start, self.end - self.capacity)
+
+    def read(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """Retourne une copie contiguë des échantillons entre deux positions absolues"""
+        end = self.end if end is None else min(end, self.end)
+        start = max(start, self.start)
+        if start >= end:
+            return np.zeros(0, dtype=np.float32)
+        first_index = start % self.capacity
+        last_index = end % self.capacity
+        if first_index < last_index or last_index == 0:
+            return self._data[first_index:last_index or self.capacity].copy()
+        return np.concatenate((self._data[first_index:], self._data[:last_index]))
+
+    def discard_before(self, position: int):
+        """Libère les échantillons antérieurs à une position absolue"""
+        self.start = min(max(self.start, position), self.end)
+
+
+class StreamingTranscriber:
+    """
+    Moteur de transcription partielle incrémentale pour une session WebSocket
+
+    Le PCM décodé est conservé dans un buffer circulaire. À chaque transcription partielle,
+    seule la fenêtre non encore validée (bornée à `window_seconds`) est retranscrite :
+    les segments qui se terminent suffisamment avant la fin de la fenêtre deviennent
+    stables et ne sont plus jamais recalculés, les suivants restent provisoires.
+    Le coût d'une transcription partielle est ainsi constant quelle que soit la durée
+    de la réunion.
+
+    Les segments stables sont numérotés dans leur ordre d'arrivée (champ "id") : delta()
+    ne renvoie au client que les segments validés depuis le dernier envoi et la fin
+    provisoire si elle a changé.
+    """
+
+    def __init__(
+        self,
+        whisper_service,
+        spool: AudioSpool,
+        language: Optional[str] = None,
+        window_seconds: float = 15.0,
+        tentative_seconds: float = 2.0,
+        buffer_seconds: float = 60.0,
+    ):
+        """
+        Args:
+            whisper_service: Service Whisper partagé
+            spool: Fichiers audio de la session (chunks reçus et PCM décodé)
+            language: Code langue ("fr", "en" ou None pour auto-détection)
+            window_seconds: Durée maximale de la fenêtre retranscrite à chaque partielle
+            tentative_seconds: Les segments se terminant dans cette marge finale restent provisoires
+            buffer_seconds: Capacité du buffer circulaire PCM
+        """
+        self.whisper_service = whisper_service
+        self.language = language
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.tentative_samples = int(tentative_seconds * SAMPLE_RATE)
+        self.buffer = PCMRingBuffer(max(buffer_seconds, window_seconds * 2))
+        self.decoder = StreamingDecoder()
+        self.spool = spool  # PCM complet de la session sur disque, réutilisé pour la finale
+        self.committed = 0  # Position absolue jusqu'à laquelle le texte est stable
+        self.stable_segments: list[dict] = []
+        self.tentative_segments: list[dict] = []
+        self.delivered = 0  # Nombre de segments stables déjà envoyés au client
+        self._sent_tentative: Optional[list[dict]] = None  # Fin provisoire déjà envoyée
+        self.replayed = False  # Session reprise depuis le spool : texte précédent perdu côté serveur
+        self._skip_samples = 0  # PCM de l'audio rejoué encore à ignorer en sortie du décodeur de la session
+        self._lock = threading.Lock()
+
+    def feed(self, chunk: bytes):
+        """
+        Enregistre un chunk audio webm dans le spool et le transmet au décodeur de la session
+
+        Le PCM déjà décodé est écrit dans le spool à chaque chunk, y compris pendant le
+        chargement du modèle (aucune transcription partielle) : la mémoire reste bornée.
+        """
+        self.spool.append_chunk(chunk)
+        self.decoder.feed(chunk)
+        with self._lock:
+            self._pull(self._live(self.decoder.read_available()))
+
+    def replay(self):
+        """
+        Reprise d'une session interrompue : décode à nouveau les chunks déjà reçus (appel bloquant)
+
+        Le flux webm ne peut être décodé qu'à partir de son en-tête (premier chunk) : les
+        chunks du spool sont envoyés à deux décodeurs. Un décodeur dédié, décodé jusqu'au
+        bout, réécrit le PCM de la session dans le spool ; le décodeur de la session reçoit
+        le même flux pour décoder ensuite les nouveaux chunks du client, et sa sortie pour
+        l'audio rejoué est ignorée.
+        Le texte de l'audio rejoué est déjà affiché par le client : les partielles reprennent
+        à la fin exacte de l'audio rejoué, la finale couvre toute la session.
+        """
+        replay_decoder = StreamingDecoder()
+        with self._lock:
+            self.spool.truncate_pcm(0)
+            decoded = 0  # Échantillons rejoués déjà produits (et ignorés) par le décodeur de la session
+            for block in self.spool.read_chunks():
+                replay_decoder.feed(block)
+                self.decoder.feed(block)
+                self._pull(replay_decoder.read_available())
+                decoded += self.decoder.read_available().size
+            self._pull(replay_decoder.finish())
+            self._skip_samples = max(0, self.spool.pcm_samples - decoded)
+            self.committed = self.buffer.end
+            self.buffer.discard_before(self.committed)
+        self.replayed = True
+
+    def _live(self, samples: np.ndarray) -> np.ndarray:
+        """Retire du PCM du décodeur de la session la fin de l'audio rejoué (déjà dans le spool)"""
+        if self._skip_samples:
+            dropped = min(self._skip_samples, samples.size)
+            self._skip_samples -= dropped
+            samples = samples[dropped:]
+        return samples
+
+    def _pull(self, samples: np.ndarray):
+        """Range le PCM nouvellement décodé dans le buffer circulaire et le spool"""
+        if samples.size:
+            self.buffer.append(samples)
+            self.spool.append_pcm(samples)
+
+    def _commit(self, segment: dict):
+        segment["id"] = len(self.stable_segments)
+        self.stable_segments.append(segment)
+        self.committed = int(segment["end"] * SAMPLE_RATE)
+
+    def next_window(self) -> Optional[tuple[int, np.ndarray]]:
+        """
+        Décode l'audio nouvellement reçu et prépare la fenêtre non validée à retranscrire
+
+        Returns:
+            (position absolue de début, PCM de la fenêtre) ou None si rien à transcrire
+        """
+        with self._lock:
+            self._pull(self._live(self.decoder.read_available()))
+
+            if self.committed < self.buffer.start:
+                print("ATTENTION: buffer PCM saturé, audio non transcrit abandonné")
+                self.committed = self.buffer.start
+
+            # Si la fenêtre dépasse la taille maximale (retard accumulé), valider le texte
+            # provisoire précédent pour ramener la fenêtre à une taille bornée
+            if self.buffer.end - self.committed > self.window_samples:
+                for segment in self.tentative_segments:
+                    if int(segment["end"] * SAMPLE_RATE) <= self.buffer.end - self.window_samples:
+                        self._commit(segment)
+                self.committed = max(self.committed, self.buffer.end - self.window_samples)
+                self.tentative_segments = []
+
+            window_start = self.committed
+            window = self.buffer.read(window_start)
+            if window.size < SAMPLE_RATE // 2:
+                return None
+
+            # Fenêtre silencieuse : ne pas solliciter Whisper, et valider le silence en gardant
+            # seulement la marge finale (un mot peut être en train de commencer)
+            if not has_speech(window):
+                self.tentative_segments = []
+                self.committed = max(self.committed, self.buffer.end - self.tentative_samples)
+                self.buffer.discard_before(self.committed)
+                return None
+
+            return window_start, window
+
+    def apply_segments(self, window_start: int, window_size: int, segments: list[dict]):
+        """
+        Intègre les segments transcrits d'une fenêtre : validation des segments stables
+
+        Le coût ne dépend que de la fenêtre ; les changements sont lus ensuite par delta().
+        """
+        with self._lock:
+            tentative = []
+            window_offset = window_start / SAMPLE_RATE
+            stable_limit = window_size - self.tentative_samples
+            for segment in segments:
+                absolute = dict(
+                    segment,
+                    start=round(window_offset + segment["start"], 2),
+                    end=round(window_offset + segment["end"], 2),
+                    text=segment["text"].strip(),
+                )
+                if not absolute["text"]:
+                    continue
+                # Un segment est stable s'il est suivi d'au moins un autre segment et se
+                # termine avant la marge provisoire de fin de fenêtre
+                is_last = segment is segments[-1]
+                if not tentative and not is_last and segment["end"] * SAMPLE_RATE <= stable_limit:
+                    self._commit(absolute)
+                else:
+                    absolute["id"] = len(self.stable_segments) + len(tentative)
+                    tentative.append(absolute)
+            self.tentative_segments = tentative
+            self.buffer.discard_before(self.committed)
+
+    def delta(self) -> Optional[dict]:
+        """
+        Changements depuis le dernier envoi au client
+
+        Returns:
+            Dictionnaire {"stable": nouveaux segments stables, "tentative": fin provisoire}
+            ("tentative" absent si elle n'a pas changé), ou None si rien de nouveau
+        """
+        with self._lock:
+            update = {}
+            if len(self.stable_segments) > self.delivered:
+                update["stable"] = self.stable_segments[self.delivered:]
+                self.delivered = len(self.stable_segments)
+            if self.tentative_segments != self._sent_tentative:
+                update["tentative"] = list(self.tentative_segments)
+                self._sent_tentative = update["tentative"]
+            if not update:
+                return None
+            update.setdefault("stable", [])
+            return update
+
+    def snapshot(self) -> dict:
+        """
+        Tous les segments de la session (reprise par un client qui se reconnecte)
+
+        Les deltas suivants partent de cet état.
+        """
+        with self._lock:
+            self.delivered = len(self.stable_segments)
+            self._sent_tentative = list(self.tentative_segments)
+            return {"stable": list(self.stable_segments), "tentative": self._sent_tentative}
+
+    def finish(self) -> np.ndarray:
+        """
+        Termine le décodage et retourne tout le PCM de la session
+
+        Le PCM a déjà été décodé au fil de l'eau : aucune nouvelle passe ffmpeg n'est nécessaire.
+        Il est lu par mmap depuis le spool, sans copie de l'enregistrement en mémoire.
+        """
+        with self._lock:
+            self._pull(self._live(self.decoder.finish()))
+            return self.spool.pcm()
+
+    def transcribe_final(self) -> dict:
+        """
+        Transcription finale de la session à partir du PCM déjà décodé
+
+        Returns:
+            Dictionnaire {"text": texte complet, "segments": segments horodatés depuis le début de la session}
+        """
+        audio = self.finish()
+        print(f"Transcription finale de {audio.size / SAMPLE_RATE:.1f}s d'audio déjà décodé")
+        if audio.size / SAMPLE_RATE > LONG_AUDIO_THRESHOLD:
+            # Longue réunion : découpée aux silences, en parallèle avec le pool de processus
+            result = self.whisper_service.transcribe_long(audio, self.language)
+        else:
+            result = self.whisper_service.transcribe_pcm_segments(audio, self.language)
+        return {
+            "text": result["text"],
+            "segments": [dict(segment, id=index) for index, segment in enumerate(result["segments"])],
+        }
+
+    def close(self):
+        """Libère le décodeur et ferme les fichiers de la session (le spool reste sur disque)"""
+        self.decoder.close()
+        self.spool.close()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.models.summary_cache import SummaryCacheEntry
+
+
+class SummaryCache:
+    """
+    Cache persistant des comptes rendus générés (table summary_cache)
+
+    Une entrée est identifiée par l'empreinte du contenu du prompt, de la transcription, du
+    modèle et des paramètres de génération : une même demande est servie sans rappeler le
+    provider. Les entrées expirent après SUMMARY_CACHE_TTL_HOURS heures (défaut 168) et les
+    moins récemment utilisées sont supprimées au-delà de SUMMARY_CACHE_MAX_ENTRIES (défaut 500).
+    """
+
+    def __init__(self, ttl_hours: float = None, max_entries: int = None):
+        self.ttl = timedelta(hours=ttl_hours or float(os.getenv("SUMMARY_CACHE_TTL_HOURS", "168")))
+        self.max_entries = max_entries or int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "500"))
+        self.enabled = self.max_entries > 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt_content: str, transcription: str, model: str, params: dict) -> str:
+        """Empreinte SHA-256 d'une demande de compte rendu"""
+        payload = json.dumps(
+            {"prompt": prompt_content, "transcription": transcription, "model": model, "params": params},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expiry_cutoff(self) -> datetime:
+        # SQLite enregistre func.now() en UTC
+        return datetime.now(timezone.utc) - self.ttl
+
+    def get(self, db: Session, key: str) -> Optional[str]:
+        """Retourne le compte rendu en cache, ou None (entrée absente ou expirée)"""
+        if not self.enabled:
+            return None
+        entry = db.query(SummaryCacheEntry).filter(
+            SummaryCacheEntry.key == key,
+            SummaryCacheEntry.created_at >= self._expiry_cutoff(),
+        ).first()
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        entry.hits += 1
+        entry.last_used_at = func.now()
+        db.commit()
+        return entry.summary
+
+    def put(self, db: Session, key: str, prompt_id: Optional[int], model: str, summary: str):
+        """Enregistre un compte rendu, puis applique l'expiration et la limite d'entrées"""
+        if not self.enabled:
+            return
+        entry = db.get(SummaryCacheEntry, key)
+        if entry is None:
+            db.add(SummaryCacheEntry(key=key, prompt_id=prompt_id, model=model, summary=summary))
+        else:
+            entry.summary = summary
+            entry.created_at = func.now()
+            entry.last_used_at = func.now()
+        db.commit()
+        self._evict(db)
+
+    def _evict(self, db: Session):
+        """Supprime les entrées expirées et les moins récemment utilisées en excès"""
+        db.query(SummaryCacheEntry).filter(
+            SummaryCacheEntry.created_at < self._expiry_cutoff()
+        ).delete(synchronize_session=False)
+        excess = db.query(SummaryCacheEntry).count() - self.max_entries
+        if excess > 0:
+            oldest = db.query(SummaryCacheEntry.key).order_by(
+                SummaryCacheEntry.last_used_at.asc()
+            ).limit(excess)
+            db.query(SummaryCacheEntry).filter(
+                SummaryCacheEntry.key.in_(oldest.scalar_subquery())
+            ).delete(synchronize_session=False)
+        db.commit()
+
+    def invalidate_prompt(self, db: Session, prompt_id: int) -> int:
+        """Supprime les comptes rendus générés avec un prompt (modifié ou supprimé)"""
+        deleted = db.query(SummaryCacheEntry).filter(
+            SummaryCacheEntry.prompt_id == prompt_id
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            print(f"Cache des comptes rendus: {deleted} entrée(s) invalidée(s) pour le prompt {prompt_id}")
+        return deleted
+
+    def stats(self, db: Session) -> dict:
+        """Compteurs de succès/échecs depuis le démarrage et taille du cache"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "enabled": self.enabled,
+            "entries": db.query(SummaryCacheEntry).count(),
+            "max_entries": self.max_entries,
+            "ttl_hours": self.ttl.total_seconds() / 3600,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+# Cache global (singleton)
+summary_cache = SummaryCache()
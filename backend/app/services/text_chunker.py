@@ -0,0 +1,69 @@
+import re
+
+
+# Estimation grossière du nombre de tokens (pas de tokenizer commun aux providers) :
+# environ 3,5 caractères par token pour du français
+CHARS_PER_TOKEN = 3.5
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estime le nombre de tokens d'un texte"""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _segments(text: str) -> list[str]:
+    """Découpe un texte en segments : paragraphes, puis phrases"""
+    segments = []
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if paragraph:
+            segments.extend(s for s in _SENTENCE_END.split(paragraph) if s)
+    return segments
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """
+    Découpe un texte en morceaux d'au plus max_tokens tokens (estimés)
+
+    Les coupures se font aux limites de segments (paragraphes et phrases) ; un segment
+    trop long à lui seul est découpé entre deux mots.
+
+    Args:
+        text: Texte à découper (transcription ou résumés partiels)
+        max_tokens: Budget de tokens par morceau
+
+    Returns:
+        Liste de morceaux dans l'ordre du texte
+    """
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    chunks: list[str] = []
+    current: list[str] = []
+    current_length = 0
+
+    def flush():
+        nonlocal current, current_length
+        if current:
+            chunks.append(" ".join(current))
+        current = []
+        current_length = 0
+
+    for segment in _segments(text):
+        if len(segment) > max_chars:
+            # Phrase sans ponctuation (transcription brute) : coupure entre deux mots
+            flush()
+            words = segment.split()
+            for word in words:
+                if current_length + len(word) + 1 > max_chars:
+                    flush()
+                current.append(word)
+                current_length += len(word) + 1
+            flush()
+            continue
+        if current_length + len(segment) + 1 > max_chars:
+            flush()
+        current.append(segment)
+        current_length += len(segment) + 1
+    flush()
+    return chunks
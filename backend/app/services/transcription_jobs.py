@@ -0,0 +1,200 @@
+import asyncio
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from app.db.database import SessionLocal
+from app.models.transcription_job import TranscriptionJob
+from app.services.readiness import readiness
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+# Répertoire des fichiers envoyés en attente de transcription (volume persistant backend/data en Docker)
+DEFAULT_UPLOAD_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "uploads"
+
+# Nombre de fichiers transcrits simultanément. Chaque transcription occupe un worker du
+# planificateur : garder une valeur inférieure au nombre de workers pour les sessions en direct.
+JOB_CONCURRENCY = int(os.getenv("TRANSCRIPTION_JOB_CONCURRENCY", "1"))
+
+
+class TranscriptionJobQueue:
+    """
+    File persistante des transcriptions de fichiers envoyés (API batch)
+
+    Les travaux sont enregistrés dans la table transcription_jobs : ils survivent à un
+    redémarrage (les travaux interrompus sont remis en file). `concurrency` tâches traitent
+    les travaux dans leur ordre d'arrivée ; chaque transcription passe par le planificateur
+    avec une priorité inférieure aux sessions en direct.
+    """
+
+    def __init__(self, scheduler, concurrency: int = JOB_CONCURRENCY, upload_dir: Path = None):
+        """
+        Args:
+            scheduler: Planificateur des transcriptions (TranscriptionScheduler)
+            concurrency: Nombre de fichiers transcrits simultanément (TRANSCRIPTION_JOB_CONCURRENCY)
+            upload_dir: Répertoire des fichiers envoyés (TRANSCRIPTION_UPLOAD_DIR, défaut backend/data/uploads)
+        """
+        self.scheduler = scheduler
+        self.concurrency = max(1, concurrency)
+        self.upload_dir = Path(upload_dir or os.getenv("TRANSCRIPTION_UPLOAD_DIR") or DEFAULT_UPLOAD_DIR)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: list[asyncio.Task] = []
+
+    def submit(self, filename: str, content: BinaryIO, language: Optional[str]) -> TranscriptionJob:
+        """
+        Enregistre un fichier envoyé et crée son travail de transcription (appel bloquant)
+
+        Args:
+            filename: Nom du fichier d'origine
+            content: Contenu du fichier, copié sur disque par blocs
+            language: Code langue ou None pour auto-détection
+        """
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        db = SessionLocal()
+        try:
+            job = TranscriptionJob(filename=filename, audio_path="", language=language, status=QUEUED)
+            db.add(job)
+            db.flush()  # Attribue l'identifiant, utilisé pour nommer le fichier
+            path = self.upload_dir / f"{job.id}{Path(filename).suffix.lower()}"
+            with open(path, "wb") as f:
+                shutil.copyfileobj(content, f, 1024 * 1024)
+            job.audio_path = str(path)
+            db.commit()
+            db.refresh(job)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        print(f"📥 Transcription #{job.id} en file: {filename}")
+        if self._loop is not None:
+            # Appelé depuis un thread : asyncio.Event n'est manipulable que depuis sa boucle
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job
+
+    def queue_position(self, db, job: TranscriptionJob) -> Optional[int]:
+        """Nombre de travaux en attente avant celui-ci (None s'il n'est plus en attente)"""
+        if job.status != QUEUED:
+            return None
+        return db.query(TranscriptionJob).filter(
+            TranscriptionJob.status == QUEUED, TranscriptionJob.id < job.id
+        ).count()
+
+    def _claim(self) -> Optional[int]:
+        """Passe le plus ancien travail en attente à l'état running"""
+        db = SessionLocal()
+        try:
+            job = db.query(TranscriptionJob).filter(
+                TranscriptionJob.status == QUEUED
+            ).order_by(TranscriptionJob.id).first()
+            if job is None:
+                return None
+            job.status = RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            db.commit()
+            return job.id
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, **fields):
+        db = SessionLocal()
+        try:
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+            if job is None:
+                return  # Supprimé pendant la transcription
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            Path(job.audio_path).unlink(missing_ok=True)
+        finally:
+            db.close()
+
+    def _requeue_interrupted(self):
+        """Remet en file les travaux interrompus par un arrêt du serveur"""
+        db = SessionLocal()
+        try:
+            count = db.query(TranscriptionJob).filter(TranscriptionJob.status == RUNNING).update(
+                {"status": QUEUED, "started_at": None}
+            )
+            db.commit()
+            if count:
+                print(f"🔁 {count} transcription(s) interrompue(s) remise(s) en file")
+        finally:
+            db.close()
+
+    def _job_input(self, job_id: int) -> tuple[str, Optional[str]]:
+        """Fichier et langue d'un travail"""
+        db = SessionLocal()
+        try:
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.id == job_id).first()
+            return job.audio_path, job.language
+        finally:
+            db.close()
+
+    async def _process(self, job_id: int):
+        # Accès SQLite bloquants : exécutés hors de la boucle d'événements
+        path, language = await asyncio.to_thread(self._job_input, job_id)
+
+        # Démarrage non bloquant : attendre que le modèle Whisper soit chargé
+        if not await asyncio.to_thread(readiness.wait, "whisper"):
+            await asyncio.to_thread(
+                self._finish, job_id, status=ERROR, error="Le modèle de transcription n'a pas pu être chargé."
+            )
+            return
+
+        print(f"Transcription #{job_id} démarrée")
+        try:
+            result = await asyncio.wrap_future(
+                self.scheduler.submit_batch(self.scheduler.whisper_service.transcribe_file, path, language)
+            )
+        except Exception as e:
+            print(f"Erreur transcription #{job_id}: {e}")
+            await asyncio.to_thread(self._finish, job_id, status=ERROR, error=str(e))
+            return
+        await asyncio.to_thread(self._finish, job_id, status=DONE, text=result["text"], duration=result["duration"])
+        print(f"✅ Transcription #{job_id} terminée ({result['duration']:.0f}s d'audio)")
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            job_id = await asyncio.to_thread(self._claim)
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=30)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                # Ne jamais arrêter le worker : le travail est marqué en erreur
+                print(f"Erreur inattendue sur la transcription #{job_id}: {e}")
+                await asyncio.to_thread(self._finish, job_id, status=ERROR, error=str(e))
+
+    def start(self):
+        """Démarre les workers (à appeler dans la boucle d'événements)"""
+        if self._tasks:
+            return
+        self._requeue_interrupted()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._loop = None
@@ -0,0 +1,239 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import numpy as np
+
+
+FINAL_PRIORITY = 0  # Les transcriptions finales passent toujours en premier
+PARTIAL_PRIORITY = 1
+BATCH_PRIORITY = 2  # Fichiers envoyés hors session : après les sessions en direct
+
+
+class _Job:
+    """Travail en file d'attente du planificateur"""
+
+    __slots__ = ("priority", "seq", "future", "fn", "args", "session", "window", "language", "taken")
+
+    def __init__(self, priority: int, seq: int, **fields):
+        self.priority = priority
+        self.seq = seq
+        self.future = Future()
+        self.fn = fields.get("fn")
+        self.args = fields.get("args", ())
+        self.session = fields.get("session")
+        self.window = fields.get("window")
+        self.language = fields.get("language")
+        self.taken = False  # Déjà intégré à un lot par un autre worker
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class TranscriptionScheduler:
+    """
+    Planificateur des transcriptions avec priorités et inférence par lots
+
+    - Une file de priorité unique alimente `workers` threads : une transcription finale
+      est toujours démarrée avant toute transcription partielle en attente.
+    - Une session n'a au plus qu'une partielle en file : une nouvelle demande remplace la
+      précédente tant que celle-ci n'a pas démarré, qui n'est donc jamais calculée.
+    - Les partielles en attente (fenêtres ≤ 30 s) de toutes les sessions sont regroupées,
+      pendant un court délai, en un seul lot d'inférence par langue.
+    """
+
+    def __init__(
+        self,
+        whisper_service,
+        workers: int = 2,
+        max_batch_size: int = None,
+        max_wait_ms: float = None,
+    ):
+        """
+        Args:
+            whisper_service: Service Whisper partagé
+            workers: Nombre de threads de transcription
+            max_batch_size: Nombre maximal de fenêtres par lot (WHISPER_BATCH_SIZE, défaut 8)
+            max_wait_ms: Délai maximal de regroupement en ms (WHISPER_BATCH_WAIT_MS, défaut 50)
+        """
+        self.whisper_service = whisper_service
+        self.max_batch_size = max_batch_size or int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+        wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("WHISPER_BATCH_WAIT_MS", "50"))
+        self.max_wait = wait_ms / 1000
+        self._heap: list[_Job] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._queued_partials: dict = {}  # session -> job partiel en attente
+        self._running_partials: set = set()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"transcription-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit_final(self, fn: Callable, *args) -> Future:
+        """Soumet une transcription finale, prioritaire sur toutes les partielles"""
+        job = _Job(FINAL_PRIORITY, next(self._sequence), fn=fn, args=args)
+        with self._condition:
+            heapq.heappush(self._heap, job)
+            self._condition.notify()
+        return job.future
+
+    def submit_batch(self, fn: Callable, *args) -> Future:
+        """Soumet une transcription de fichier (API batch), après les finales et les partielles"""
+        job = _Job(BATCH_PRIORITY, next(self._sequence), fn=fn, args=args)
+        with self._condition:
+            heapq.heappush(self._heap, job)
+            self._condition.notify()
+        return job.future
+
+    def submit_partial(self, session, window: np.ndarray, language: str = None) -> Optional[Future]:
+        """
+        Soumet la fenêtre partielle d'une session
+
+        Returns:
+            Future résolu avec les segments de la fenêtre, ou None si une partielle de la
+            session est déjà en cours de calcul (la nouvelle demande est alors ignorée)
+        """
+        with self._condition:
+            if session in self._running_partials:
+                return None
+            previous = self._queued_partials.pop(session, None)
+            if previous is not None:
+                # Partielle obsolète jamais démarrée : elle est abandonnée
+                previous.future.cancel()
+            job = _Job(
+                PARTIAL_PRIORITY, next(self._sequence), session=session, window=window, language=language
+            )
+            self._queued_partials[session] = job
+            heapq.heappush(self._heap, job)
+            self._condition.notify()
+        return job.future
+
+    def cancel_partial(self, session):
+        """Abandonne la partielle en attente d'une session (fin d'enregistrement)"""
+        with self._condition:
+            job = self._queued_partials.pop(session, None)
+            if job is not None:
+                job.future.cancel()
+
+    def is_running(self, session) -> bool:
+        """Indique si une partielle de la session est en cours de calcul"""
+        with self._condition:
+            return session in self._running_partials
+
+    def stats(self) -> dict:
+        """Nombre de travaux en attente et en cours"""
+        with self._condition:
+            queued = [job for job in self._heap if not job.taken and not job.future.cancelled()]
+            return {
+                "queued_finals": sum(1 for job in queued if job.priority == FINAL_PRIORITY),
+                "queued_partials": sum(1 for job in queued if job.priority == PARTIAL_PRIORITY),
+                "queued_batch": sum(1 for job in queued if job.priority == BATCH_PRIORITY),
+                "running_partials": len(self._running_partials),
+            }
+
+    def _pop(self) -> _Job:
+        """Retire le travail le plus prioritaire encore valide (appelé sous verrou)"""
+        while True:
+            while not self._heap:
+                self._condition.wait()
+            job = heapq.heappop(self._heap)
+            if job.taken or job.future.cancelled():
+                continue
+            return job
+
+    def _take_partial(self, job: _Job) -> bool:
+        """Marque une partielle comme démarrée (appelé sous verrou)"""
+        job.taken = True
+        self._queued_partials.pop(job.session, None)
+        if not job.future.set_running_or_notify_cancel():
+            return False
+        self._running_partials.add(job.session)
+        return True
+
+    def _next_jobs(self) -> list[_Job]:
+        """Retourne une transcription finale (ou batch) seule, ou un lot de partielles de même langue"""
+        with self._condition:
+            while True:
+                job = self._pop()
+                if job.priority != PARTIAL_PRIORITY:
+                    if job.future.set_running_or_notify_cancel():
+                        return [job]
+                    continue
+                if self._take_partial(job):
+                    break
+
+            batch = [job]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                candidates = [
+                    other for other in self._queued_partials.values() if other.language == job.language
+                ]
+                for other in candidates[: self.max_batch_size - len(batch)]:
+                    if self._take_partial(other):
+                        batch.append(other)
+                remaining = deadline - time.monotonic()
+                final_waiting = self._heap and self._heap[0].priority == FINAL_PRIORITY
+                if len(batch) >= self.max_batch_size or remaining <= 0 or final_waiting:
+                    break
+                self._condition.wait(timeout=remaining)
+            return batch
+
+    def _run(self):
+        while True:
+            jobs = self._next_jobs()
+            if jobs[0].priority != PARTIAL_PRIORITY:
+                job = jobs[0]
+                try:
+                    job.future.set_result(job.fn(*job.args))
+                except Exception as e:
+                    job.future.set_exception(e)
+            else:
+                self._run_partials(jobs)
+
+    def _run_partials(self, jobs: list[_Job]):
+        language = jobs[0].language
+        try:
+            results = self.whisper_service.transcribe_windows([job.window for job in jobs], language)
+            print(f"Lot d'inférence: {len(jobs)} fenêtre(s) (langue: {language or 'auto'})")
+            for job, segments in zip(jobs, results):
+                job.future.set_result(segments)
+        except Exception as e:
+            print(f"Erreur lors de l'inférence par lot: {e}")
+            for job in jobs:
+                job.future.set_exception(e)
+        finally:
+            with self._condition:
+                for job in jobs:
+                    self._running_partials.discard(job.session)
+
+
+class PartialCadence:
+    """
+    Intervalle adaptatif entre deux transcriptions partielles d'une session
+
+    Quand le système est surchargé (partielle lente ou remplacée avant d'avoir démarré),
+    l'intervalle s'allonge ; il revient progressivement à sa valeur de base ensuite.
+    """
+
+    def __init__(self, base_interval: float = 3.0, max_interval: float = 15.0):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.interval = base_interval
+
+    def record(self, latency: float):
+        """Ajuste l'intervalle selon la latence de la dernière partielle"""
+        if latency > self.interval * 0.5:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+        elif latency < self.interval * 0.2:
+            self.interval = max(self.base_interval, self.interval / 1.5)
+
+    def record_dropped(self):
+        """Une partielle a été remplacée sans être calculée : espacer les suivantes"""
+        self.interval = min(self.max_interval, self.interval * 1.5)
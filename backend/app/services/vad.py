@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+from app.services.audio_decoder import SAMPLE_RATE
+
+
+# Détection d'activité vocale (VAD) par énergie, désactivable avec WHISPER_VAD=0
+VAD_ENABLED = os.getenv("WHISPER_VAD", "1") != "0"
+
+FRAME_MS = 30  # Durée d'une trame d'analyse
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+NOISE_MARGIN_DB = 12.0  # Marge au-dessus du bruit de fond estimé
+MIN_THRESHOLD_DB = -50.0  # Seuil plancher (micro très silencieux)
+MAX_THRESHOLD_DB = -35.0  # Seuil plafond (parole continue sans pause)
+
+
+BLOCK_FRAMES = 2000  # Trames analysées à la fois (1 minute) : mémoire bornée sur les longs audios
+
+
+def _frame_levels(pcm: np.ndarray) -> np.ndarray:
+    """
+    Niveau RMS en dBFS de chaque trame de 30 ms
+
+    Calculé par blocs : sur un long enregistrement projeté en mémoire, seul un bloc est
+    converti en float64 à la fois.
+    """
+    frame_count = pcm.size // FRAME_SAMPLES
+    if frame_count == 0:
+        return np.zeros(0)
+    levels = np.empty(frame_count)
+    for first in range(0, frame_count, BLOCK_FRAMES):
+        last = min(first + BLOCK_FRAMES, frame_count)
+        frames = pcm[first * FRAME_SAMPLES:last * FRAME_SAMPLES].reshape(last - first, FRAME_SAMPLES)
+        levels[first:last] = np.mean(np.square(frames, dtype=np.float64), axis=1)
+    return 20 * np.log10(np.sqrt(levels) + 1e-10)
+
+
+def _speech_frames(levels: np.ndarray) -> np.ndarray:
+    """Trames considérées comme de la parole, avec un seuil adapté au bruit de fond"""
+    noise_floor = np.percentile(levels, 10)
+    threshold = np.clip(noise_floor + NOISE_MARGIN_DB, MIN_THRESHOLD_DB, MAX_THRESHOLD_DB)
+    return levels > threshold
+
+
+def speech_regions(
+    pcm: np.ndarray,
+    min_speech_ms: int = 250,
+    min_silence_ms: int = 600,
+    padding_ms: int = 200,
+) -> list[tuple[int, int]]:
+    """
+    Détecte les zones de parole d'un buffer PCM
+
+    Args:
+        pcm: Échantillons float32 mono 16 kHz
+        min_speech_ms: Durée minimale d'une zone de parole (les clics isolés sont ignorés)
+        min_silence_ms: Les pauses plus courtes sont fusionnées dans la zone de parole
+        padding_ms: Marge ajoutée autour de chaque zone pour ne pas couper les mots
+
+    Returns:
+        Liste de zones (début, fin) en échantillons
+    """
+    levels = _frame_levels(pcm)
+    if levels.size == 0:
+        return []
+    flags = _speech_frames(levels)
+
+    # Zones de trames consécutives au-dessus du seuil
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    regions: list[list[int]] = []
+    min_gap = min_silence_ms // FRAME_MS
+    for start, end in zip(starts, ends):
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    padding = padding_ms * SAMPLE_RATE // 1000
+    min_length = min_speech_ms // FRAME_MS
+    result: list[tuple[int, int]] = []
+    for start, end in regions:
+        if end - start < min_length:
+            continue
+        sample_start = max(0, int(start) * FRAME_SAMPLES - padding)
+        sample_end = min(pcm.size, int(end) * FRAME_SAMPLES + padding)
+        if result and sample_start <= result[-1][1]:
+            result[-1] = (result[-1][0], sample_end)
+        else:
+            result.append((sample_start, sample_end))
+    return result
+
+
+def has_speech(pcm: np.ndarray) -> bool:
+    """Indique si le buffer contient au moins une zone de parole"""
+    if not VAD_ENABLED:
+        return pcm.size > 0
+    return bool(speech_regions(pcm))
+
+
+def speech_with_regions(pcm: np.ndarray) -> tuple[np.ndarray, list[tuple[int, int]]]:
+    """
+    Ne conserve que les zones de parole d'un buffer PCM
+
+    Returns:
+        (zones de parole concaténées, zones (début, fin) conservées en échantillons), pour
+        replacer ensuite les timestamps dans l'audio d'origine avec source_time
+    """
+    if not VAD_ENABLED:
+        return pcm, [(0, pcm.size)]
+    regions = speech_regions(pcm)
+    if not regions:
+        return np.zeros(0, dtype=np.float32), []
+    return np.concatenate([pcm[start:end] for start, end in regions]), regions
+
+
+def source_time(seconds: float, regions: list[tuple[int, int]]) -> float:
+    """Convertit un instant de l'audio filtré (zones de parole concaténées) en instant de l'audio d'origine"""
+    position = seconds * SAMPLE_RATE
+    for start, end in regions:
+        if position <= end - start:
+            return (start + position) / SAMPLE_RATE
+        position -= end - start
+    return regions[-1][1] / SAMPLE_RATE if regions else seconds
@@ -0,0 +1,126 @@
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+
+# Répertoire des modèles convertis (volume persistant backend/data en Docker)
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent.parent / "data" / "whisper-models"
+
+# Chargement par projection mémoire des poids openai-whisper (WHISPER_MMAP=0 pour désactiver)
+MMAP_ENABLED = os.getenv("WHISPER_MMAP", "1") != "0"
+
+STORE_FORMAT_VERSION = 1
+
+
+class WhisperModelStore:
+    """
+    Magasin de modèles openai-whisper chargeables par mmap
+
+    whisper.load_model désérialise tout le checkpoint (poids fp16 convertis en fp32) à chaque
+    démarrage. Le checkpoint est converti une seule fois en fichier torch au format zip, poids
+    déjà en fp32 et alignés, puis chargé avec torch.load(mmap=True) : les tenseurs du modèle
+    pointent directement dans le fichier projeté en mémoire. Le démarrage ne lit que les pages
+    utilisées et plusieurs processus du même hôte partagent les pages du cache système.
+    """
+
+    def __init__(self, root: Path = None):
+        """
+        Args:
+            root: Répertoire des modèles convertis (WHISPER_MODEL_STORE, défaut backend/data/whisper-models)
+        """
+        self.root = Path(root or os.getenv("WHISPER_MODEL_STORE") or DEFAULT_STORE_DIR)
+
+    def path(self, model_size: str) -> Path:
+        return self.root / f"{model_size}.v{STORE_FORMAT_VERSION}.pt"
+
+    def convert(self, model_size: str) -> Path:
+        """Charge le checkpoint officiel et l'enregistre dans le magasin (une seule fois)"""
+        import torch
+        import whisper
+
+        print(f"Conversion du modèle Whisper {model_size} pour le chargement par mmap...")
+        model = whisper.load_model(model_size, device="cpu")
+        path = self.path(model_size)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique : un autre processus ne voit jamais un fichier partiel
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        torch.save(
+            {"dims": asdict(model.dims), "model_state_dict": model.state_dict()},
+            tmp_path,
+        )
+        os.replace(tmp_path, path)
+        print(f"Modèle converti: {path} ({path.stat().st_size / 1e6:.0f} MB)")
+        return path
+
+    def load(self, model_size: str, device: str):
+        """
+        Charge un modèle openai-whisper depuis le magasin (converti au premier appel)
+
+        Returns:
+            Modèle whisper sur device, ou None si le modèle ne peut pas être chargé par mmap
+            (nom de fichier personnalisé, version de torch trop ancienne...)
+        """
+        import torch
+        from whisper.model import ModelDimensions, Whisper
+
+        if os.sep in model_size or model_size.endswith(".pt"):
+            return None  # Checkpoint personnalisé : chargé tel quel par whisper.load_model
+        path = self.path(model_size)
+        if not path.exists():
+            self.convert(model_size)
+
+        try:
+            checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+        except TypeError:
+            print("torch < 2.1 : chargement par mmap indisponible")
+            return None
+
+        dims = ModelDimensions(**checkpoint["dims"])
+        # Modèle construit sans allouer ni initialiser ses poids : assign=True branche
+        # directement les tenseurs projetés en mémoire
+        with torch.device("meta"):
+            model = Whisper(dims)
+        model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+        self._restore_buffers(model, model_size)
+
+        if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+            print("Poids Whisper incomplets dans le magasin, chargement classique")
+            return None
+        return model.to(device)
+
+    @staticmethod
+    def _restore_buffers(model, model_size: str):
+        """Recrée les buffers non persistants (absents du state_dict), comme Whisper.__init__"""
+        import numpy as np
+        import torch
+        import whisper
+
+        n_ctx = model.dims.n_text_ctx
+        model.decoder.mask = torch.empty(n_ctx, n_ctx).fill_(-np.inf).triu_(1)
+
+        all_heads = torch.zeros(model.dims.n_text_layer, model.dims.n_text_head, dtype=torch.bool)
+        all_heads[model.dims.n_text_layer // 2:] = True
+        model.alignment_heads = all_heads.to_sparse()
+        alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_size)
+        if alignment_heads is not None:
+            model.set_alignment_heads(alignment_heads)
+
+
+def load_openai_whisper(model_size: str, device: str, store: Optional[WhisperModelStore] = None):
+    """
+    Charge un modèle openai-whisper, par mmap depuis le magasin si possible
+
+    Repli sur whisper.load_model si le magasin est désactivé (WHISPER_MMAP=0) ou inutilisable.
+    """
+    import whisper
+
+    if MMAP_ENABLED:
+        try:
+            model = (store or WhisperModelStore()).load(model_size, device)
+            if model is not None:
+                print(f"Modèle Whisper {model_size} chargé par mmap")
+                return model
+        except Exception as e:
+            print(f"ATTENTION: chargement par mmap impossible ({e}), chargement classique")
+    return whisper.load_model(model_size, device=device)
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from collections import deque
+
+import numpy as np
+
+from app.services.asr_engines import configure_torch_threads, cpu_threads_per_job
+from app.services.audio_decoder import decode_file, pcm_duration
+from app.services.long_audio import LONG_AUDIO_THRESHOLD, transcribe_in_chunks
+
+
+# Service Whisper du worker, chargé par _init_worker
+_service = None
+
+
+def _init_worker(threads: int, model_size: str, processes: int):
+    """
+    Initialisation d'un worker : répartir les cœurs entre les processus et charger le modèle
+
+    Les poids openai-whisper sont projetés en mémoire depuis le magasin de modèles (converti
+    par le processus principal) : les workers partagent les pages du cache système.
+    """
+    global _service
+    from app.services.whisper_service import WhisperService
+
+    configure_torch_threads(threads)
+    _service = WhisperService(model_size, concurrent_jobs=processes)
+    _service.load_model()
+
+
+def _call(method: str, args: tuple, kwargs: dict):
+    """Exécute une méthode du service Whisper dans le worker"""
+    return getattr(_service, method)(*args, **kwargs)
+
+
+class WhisperProcessPool:
+    """
+    Pool de processus Whisper, pour sortir l'inférence du GIL du processus uvicorn
+
+    Expose les mêmes méthodes de transcription que WhisperService : chaque appel est envoyé
+    par IPC à l'un des N workers et le thread appelant attend le résultat sans tenir le GIL.
+    Les workers sont lancés en mode spawn (nouvel interpréteur) : ils n'héritent ni des
+    sockets, ni des pipes ffmpeg des sessions, ni des verrous des threads du serveur, et
+    peuvent donc être démarrés pendant que le serveur répond déjà aux requêtes.
+    Disponible uniquement sur CPU.
+    """
+
+    # Méthodes exécutées dans les workers, les autres restent locales
+    REMOTE_METHODS = (
+        "transcribe_pcm", "transcribe_pcm_segments", "transcribe_window", "transcribe_windows",
+        "transcribe_streaming", "transcribe_segments",
+    )
+
+    def __init__(self, whisper_service, processes: int):
+        """
+        Args:
+            whisper_service: Service Whisper du processus principal (le modèle y est chargé en premier,
+                ce qui convertit le checkpoint dans le magasin de modèles avant le démarrage des workers)
+            processes: Nombre de processus workers
+        """
+        if whisper_service.device != "cpu":
+            raise ValueError(
+                f"Le pool de processus Whisper n'est disponible que sur CPU (device: {whisper_service.device})"
+            )
+        self.whisper_service = whisper_service
+        self.processes = processes
+
+        whisper_service.load_model()
+        threads = cpu_threads_per_job(processes)
+        print(f"Démarrage de {processes} workers Whisper ({threads} thread(s) chacun)...")
+        # Pool (et non ProcessPoolExecutor) : tous les workers démarrent et chargent le modèle
+        # immédiatement, avant les premières transcriptions
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            processes, initializer=_init_worker, initargs=(threads, whisper_service.model_size, processes)
+        )
+
+    def __getattr__(self, name: str):
+        if name in self.REMOTE_METHODS:
+            def remote(*args, **kwargs):
+                return self._pool.apply(_call, (name, args, kwargs))
+            return remote
+        return getattr(self.whisper_service, name)
+
+    def transcribe_file(self, path: str, language: str = None) -> dict:
+        """Transcrit un fichier envoyé : décodé ici, puis transcrit dans un ou plusieurs workers"""
+        audio = decode_file(path)
+        print(f"Transcription du fichier {path} ({pcm_duration(audio):.1f}s d'audio)")
+        if pcm_duration(audio) > LONG_AUDIO_THRESHOLD:
+            text = self.transcribe_long(audio, language)["text"]
+        else:
+            text = self.transcribe_pcm(audio, language)
+        return {"text": text, "duration": pcm_duration(audio)}
+
+    def transcribe_long(self, audio: np.ndarray, language: str = None) -> dict:
+        """
+        Transcrit un long audio en répartissant ses morceaux (coupés aux silences) entre les workers
+
+        Un worker reste disponible pour les sessions en direct : au plus N-1 morceaux sont en
+        cours de calcul à la fois, les suivants sont envoyés au fur et à mesure.
+        """
+        workers = max(1, self.processes - 1)
+
+        def transcribe_chunks(pcm, bounds, chunk_language):
+            pending = deque()
+            results = []
+            for start, end in bounds:
+                if len(pending) >= workers:
+                    results.append(pending.popleft().get())
+                # Copie du seul morceau envoyé (le PCM complet peut être projeté en mémoire)
+                chunk = np.array(pcm[start:end], dtype=np.float32)
+                pending.append(self._pool.apply_async(_call, ("transcribe_segments", (chunk, chunk_language), {})))
+            results.extend(result.get() for result in pending)
+            return results
+
+        print(f"Transcription d'un audio long sur {workers} worker(s)")
+        return transcribe_in_chunks(audio, language, transcribe_chunks)
+
+    def close(self):
+        """Arrête les workers"""
+        self._pool.terminate()
+        self._pool.join()
+
+
+def pool_size() -> int:
+    """Nombre de processus Whisper configuré (WHISPER_PROCESSES, 0 = inférence dans le processus principal)"""
+    return int(os.getenv("WHISPER_PROCESSES", "0"))
@@ -1,22 +1,54 @@
-import whisper
-import tempfile
-import os
-import subprocess
+import math
+import threading
+
+import numpy as np
 import torch
 
+from app.services.audio_decoder import decode_audio, decode_file, pcm_duration, wav_duration
+from app.services.long_audio import LONG_AUDIO_THRESHOLD, transcribe_in_chunks
+from app.services.vad import source_time, speech_with_regions
+from app.services.asr_engines import create_engine
+
+
+def _segment(segment: dict, regions: list = None) -> dict:
+    """
+    Segment compact renvoyé aux clients : timestamps, texte et confiance
+
+    Args:
+        segment: Segment du moteur (start, end, text et, selon le moteur, avg_logprob, no_speech_prob)
+        regions: Zones de parole conservées par la VAD, pour replacer les timestamps dans l'audio d'origine
+
+    La confiance est la probabilité moyenne des tokens du segment (exp du logprob moyen).
+    """
+    start, end = segment["start"], segment["end"]
+    if regions:
+        start, end = source_time(start, regions), source_time(end, regions)
+    result = {"start": round(start, 2), "end": round(end, 2), "text": segment["text"].strip()}
+    if segment.get("avg_logprob") is not None:
+        result["confidence"] = round(math.exp(segment["avg_logprob"]), 3)
+    if segment.get("no_speech_prob") is not None:
+        result["no_speech_prob"] = round(segment["no_speech_prob"], 3)
+    return result
+
 
 class WhisperService:
-    def __init__(self, model_size: str = "small"):
+    def __init__(self, model_size: str = "small", concurrent_jobs: int = 1):
         """
         Initialise le service Whisper
         
         Args:
             model_size: Taille du modèle Whisper (tiny, base, small, medium, large)
                        "small" offre un bon compromis qualité/vitesse
+            concurrent_jobs: Nombre de transcriptions exécutées en parallèle (taille du pool de
+                             workers), utilisé pour répartir les threads CPU
+        
+        Le moteur d'inférence (openai-whisper ou faster-whisper) est choisi via WHISPER_ENGINE.
         """
-        self.model = None
         self.model_size = model_size
         self.device = self._detect_device()
+        self.engine = create_engine(model_size, self.device, concurrent_jobs=concurrent_jobs)
+        # Le modèle peut être demandé par le chargement en tâche de fond et une transcription
+        self._load_lock = threading.Lock()
 
     def _detect_device(self):
         """Détecte automatiquement le meilleur device (GPU si disponible, sinon CPU)"""
@@ -33,106 +65,106 @@ class WhisperService:
 
     def load_model(self):
         """Charge le modèle Whisper (lazy loading avec cache)"""
-        if self.model is None:
-            print(f"Chargement du modèle Whisper: {self.model_size} sur {self.device}")
-            self.model = whisper.load_model(self.model_size, device=self.device)
+        if self.engine.is_loaded:
+            return
+        with self._load_lock:
+            if self.engine.is_loaded:
+                return
+            print(f"Chargement du modèle Whisper: {self.model_size} sur {self.device} (moteur: {self.engine.name})")
+            self.engine.load()
             print(f"Modèle Whisper chargé avec succès sur {self.device}")
     
     def preload_model(self):
         """Précharge le modèle au démarrage pour éviter le délai lors de la première transcription"""
-        if self.model is None:
+        if not self.engine.is_loaded:
             print(f"Préchargement du modèle Whisper: {self.model_size} sur {self.device}")
             self.load_model()
             print(f"✅ Modèle Whisper préchargé et prêt à l'emploi")
         else:
             print(f"✅ Modèle Whisper déjà chargé")
 
-    def convert_webm_to_wav(self, webm_data: bytes) -> bytes:
+    def transcribe_audio(self, audio_data: bytes, is_webm: bool = True, language: str = "fr") -> str:
         """
-        Convertit un fichier webm/opus en WAV PCM via ffmpeg
+        Transcrit un audio en texte
         
         Args:
-            webm_data: Données audio au format webm/opus
+            audio_data: Données audio (webm/opus ou WAV)
+            is_webm: True si les données sont au format webm/opus
+            language: Code langue ("fr", "en" ou None pour auto-détection)
         
         Returns:
-            Données audio au format WAV PCM
+            Texte transcrit
         """
-        # Créer un fichier temporaire pour l'input
-        with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as input_file:
-            input_file.write(webm_data)
-            input_path = input_file.name
+        self.load_model()
 
-        try:
-            # Créer un fichier temporaire pour l'output
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as output_file:
-                output_path = output_file.name
+        # Pour un WAV, valider la durée directement depuis l'en-tête avant tout décodage
+        # (0.0 = en-tête illisible : on laisse ffmpeg décoder le fichier)
+        if not is_webm and 0.0 < wav_duration(audio_data) < 1.0:
+            raise ValueError("L'audio est trop court ou vide. Veuillez fournir au moins 1 seconde d'audio.")
 
-            try:
-                # Utiliser ffmpeg pour convertir
-                subprocess.run(
-                    [
-                        "ffmpeg",
-                        "-i",
-                        input_path,
-                        "-ar",
-                        "16000",  # Sample rate 16kHz (requis par Whisper)
-                        "-ac",
-                        "1",  # Mono
-                        "-f",
-                        "wav",
-                        "-y",  # Overwrite output file
-                        output_path,
-                    ],
-                    check=True,
-                    capture_output=True,
-                )
+        # ffmpeg décode le webm/opus directement en mémoire (les WAV 16 kHz sont lus sans ffmpeg)
+        audio = decode_audio(audio_data)
 
-                # Lire le fichier WAV converti
-                with open(output_path, "rb") as f:
-                    wav_data = f.read()
-
-                return wav_data
-            finally:
-                # Nettoyer le fichier de sortie
-                if os.path.exists(output_path):
-                    os.unlink(output_path)
-        finally:
-            # Nettoyer le fichier d'entrée
-            if os.path.exists(input_path):
-                os.unlink(input_path)
-
-    def transcribe_audio(self, audio_data: bytes, is_webm: bool = True) -> str:
+        # Transcrire avec Whisper
+        result = self.engine.transcribe(audio, language=language)
+        return result["text"].strip()
+
+    def transcribe_file(self, path: str, language: str = None) -> dict:
         """
-        Transcrit un audio en texte
-        
+        Transcrit un fichier audio envoyé (API batch)
+
         Args:
-            audio_data: Données audio (webm/opus ou WAV)
-            is_webm: True si les données sont au format webm/opus
-        
+            path: Chemin du fichier (tout format lu par ffmpeg)
+            language: Code langue ("fr", "en" ou None pour auto-détection)
+
         Returns:
-            Texte transcrit
+            Dictionnaire {"text": texte transcrit, "duration": durée de l'audio en secondes}
         """
-        self.load_model()
-
-        if is_webm:
-            # Convertir webm en WAV
-            wav_data = self.convert_webm_to_wav(audio_data)
+        audio = decode_file(path)
+        print(f"Transcription du fichier {path} ({pcm_duration(audio):.1f}s d'audio)")
+        if pcm_duration(audio) > LONG_AUDIO_THRESHOLD:
+            text = self.transcribe_long(audio, language)["text"]
         else:
-            wav_data = audio_data
+            text = self.transcribe_pcm(audio, language)
+        return {"text": text, "duration": pcm_duration(audio)}
+
+    def transcribe_long(self, audio: np.ndarray, language: str = None) -> dict:
+        """
+        Transcrit un long audio découpé aux silences (morceaux transcrits l'un après l'autre)
 
-        # Sauvegarder temporairement pour Whisper
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            temp_file.write(wav_data)
-            temp_path = temp_file.name
+        Le pool de processus (WHISPER_PROCESSES) remplace cette méthode pour transcrire les
+        morceaux en parallèle.
 
-        try:
-            # Transcrire avec Whisper
-            result = self.model.transcribe(temp_path, language="fr")
-            return result["text"].strip()
-        finally:
-            # Nettoyer le fichier temporaire
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        Returns:
+            Dictionnaire {"text": texte complet, "segments": segments en temps absolu}
+        """
+        def transcribe_chunks(pcm, bounds, chunk_language):
+            return [self.transcribe_segments(pcm[start:end], chunk_language) for start, end in bounds]
+
+        return transcribe_in_chunks(audio, language, transcribe_chunks)
+
+    def transcribe_segments(self, pcm: np.ndarray, language: str = None) -> list[dict]:
+        """
+        Transcrit un morceau d'un long audio
+
+        Comme transcribe_pcm_segments : seules les zones de parole (VAD) sont transmises à
+        Whisper, et une transcription vide est retentée sans langue imposée.
+
+        Returns:
+            Liste de segments {"start", "end", "text", "confidence", ...} relatifs au début du morceau
+        """
+        self.load_model()
+        pcm = np.ascontiguousarray(pcm, dtype=np.float32)
+        speech, regions = speech_with_regions(pcm)
+        if speech.size == 0:
+            return []
+        options = dict(task="transcribe", temperature=0.0, best_of=1, beam_size=3)
+        result = self.engine.transcribe(speech, language=language, **options)
+        if not result["text"].strip() and language is not None:
+            print("Morceau transcrit vide, tentative sans spécifier la langue...")
+            result = self.engine.transcribe(speech, language=None, **options)
+        # Timestamps replacés dans le morceau d'origine (les silences retirés par la VAD)
+        return [_segment(s, regions) for s in result.get("segments", [])]
 
     def transcribe_streaming(self, audio_chunks: list[bytes], language: str = None, is_partial: bool = False) -> str:
         """
@@ -152,88 +184,99 @@ class WhisperService:
         print(f"Transcription de {len(audio_chunks)} chunks audio...")
         self.load_model()
         
-        # Approche simplifiée : concaténer tous les chunks en bytes et sauvegarder
+        # Approche simplifiée : concaténer tous les chunks en bytes
         # Les chunks MediaRecorder sont des fragments webm qui peuvent être concaténés
         combined_webm = b"".join(audio_chunks)
         print(f"Taille totale des chunks combinés: {len(combined_webm)} bytes")
         
-        # Sauvegarder le webm combiné
-        webm_file = tempfile.NamedTemporaryFile(suffix=".webm", delete=False)
-        webm_file.write(combined_webm)
-        webm_file.close()
-        webm_path = webm_file.name
+        try:
+            # Décoder directement le webm en PCM via un pipe ffmpeg (aucun fichier temporaire)
+            print(f"Décodage webm vers PCM avec ffmpeg...")
+            audio = decode_audio(combined_webm)
+            print(f"Décodage réussi: {audio.size} échantillons")
+        except ValueError:
+            # Re-lancer les ValueError telles quelles (messages d'erreur user-friendly)
+            raise
+        except Exception as e:
+            print(f"Erreur lors du décodage de l'audio: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
+
+        return self.transcribe_pcm(audio, language, is_partial)
+
+    def transcribe_pcm(self, audio: np.ndarray, language: str = None, is_partial: bool = False) -> str:
+        """
+        Transcrit un audio déjà décodé (PCM float32 mono 16 kHz)
+        
+        Args:
+            audio: Échantillons PCM, par exemple ceux décodés au fil de l'eau pendant la session
+            language: Code langue ("fr" pour français, "en" pour anglais, None pour auto-détection)
+            is_partial: True si c'est une transcription partielle, False pour la transcription finale
         
+        Returns:
+            Texte transcrit complet
+        """
+        return self.transcribe_pcm_segments(audio, language, is_partial)["text"]
+
+    def transcribe_pcm_segments(self, audio: np.ndarray, language: str = None, is_partial: bool = False) -> dict:
+        """
+        Transcrit un audio déjà décodé et conserve les segments de Whisper
+
+        Args:
+            audio: Échantillons PCM float32 mono 16 kHz
+            language: Code langue ("fr", "en" ou None pour auto-détection)
+            is_partial: True si c'est une transcription partielle, False pour la transcription finale
+
+        Returns:
+            Dictionnaire {"text": texte complet, "segments": [{"start", "end", "text", "confidence",
+            "no_speech_prob"}]}, timestamps en secondes depuis le début de l'audio fourni
+        """
+        self.load_model()
+
         try:
             # Définir la durée minimale requise selon le type de transcription
-            # Pour les transcriptions partielles, on est plus tolérant (0.5s minimum)
-            # Pour la transcription finale, on exige au moins 1 seconde
             if is_partial:
                 MIN_DURATION = 0.5  # 0.5 seconde pour les transcriptions partielles
             else:
                 MIN_DURATION = 1.0  # 1 seconde pour la transcription finale
             
-            # Vérifier la durée de l'audio avant conversion
-            audio_duration = self.get_audio_duration(webm_path)
-            print(f"Durée de l'audio: {audio_duration:.2f} secondes (partielle: {is_partial})")
+            # Durée calculée à partir du nombre d'échantillons décodés (pas de ffprobe)
+            audio_duration = pcm_duration(audio)
+            print(f"Durée de l'audio décodé: {audio_duration:.2f} secondes (partielle: {is_partial})")
             
-            # Si ffprobe ne peut pas déterminer la durée (retourne 0.0), on essaie quand même la conversion
-            # car parfois les fichiers webm peuvent être valides même si ffprobe échoue
-            if audio_duration == 0.0:
-                print("ATTENTION: ffprobe n'a pas pu déterminer la durée, on continue quand même...")
-                # Pour les transcriptions partielles, on continue sans vérifier la durée
+            if audio_duration < MIN_DURATION:
+                # Pour les transcriptions partielles, on retourne simplement une chaîne vide au lieu d'erreur
                 if is_partial:
-                    pass  # On continue
-                # Pour la transcription finale, on vérifie la taille du fichier comme alternative
-                elif len(combined_webm) < 5000:  # Moins de 5KB = probablement vide
+                    print(f"Transcription partielle trop courte ({audio_duration:.2f}s), retour vide")
+                    return {"text": "", "segments": []}
+                elif audio.size == 0:
                     error_msg = "Le fichier audio semble vide ou corrompu. Vérifiez que le microphone fonctionne correctement."
                     print(f"ERREUR: {error_msg}")
                     raise ValueError(error_msg)
-            else:
-                if audio_duration < MIN_DURATION:
-                    # Pour les transcriptions partielles, on retourne simplement une chaîne vide au lieu d'erreur
-                    if is_partial:
-                        print(f"Transcription partielle trop courte ({audio_duration:.2f}s), retour vide")
-                        return ""
-                    else:
-                        error_msg = f"L'audio est trop court ({audio_duration:.1f}s). Veuillez enregistrer au moins {MIN_DURATION:.0f} seconde d'audio."
-                        print(f"ERREUR: {error_msg}")
-                        raise ValueError(error_msg)
-            
-            # Convertir directement le webm en WAV
-            print(f"Conversion webm vers WAV avec ffmpeg...")
-            wav_data = self.convert_webm_to_wav_from_file(webm_path)
-            print(f"Conversion réussie, taille WAV: {len(wav_data)} bytes")
-            
-            if len(wav_data) < 1000:
-                error_msg = "Le fichier audio converti est trop petit ou vide. Vérifiez que le microphone fonctionne correctement."
-                print(f"ERREUR: {error_msg}")
-                raise ValueError(error_msg)
-            
-            # Sauvegarder le WAV temporairement pour Whisper
-            wav_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-            wav_file.write(wav_data)
-            wav_file.close()
-            wav_path = wav_file.name
-            
-            # Vérifier à nouveau la durée après conversion
-            wav_duration = self.get_audio_duration(wav_path)
-            print(f"Durée du WAV converti: {wav_duration:.2f} secondes")
-            
-            if wav_duration < MIN_DURATION:
-                # Pour les transcriptions partielles, on retourne simplement une chaîne vide
-                if is_partial:
-                    print(f"WAV converti trop court pour transcription partielle ({wav_duration:.2f}s), retour vide")
-                    return ""
                 else:
-                    error_msg = f"L'audio converti est trop court ({wav_duration:.1f}s). L'enregistrement peut être silencieux ou corrompu."
+                    error_msg = f"L'audio est trop court ({audio_duration:.1f}s). Veuillez enregistrer au moins {MIN_DURATION:.0f} seconde d'audio."
                     print(f"ERREUR: {error_msg}")
                     raise ValueError(error_msg)
             
+            # Ne transmettre à Whisper que les zones de parole (VAD) : les silences coûtent
+            # du calcul et provoquent les erreurs de tensor sur les audios vides
+            speech, regions = speech_with_regions(audio)
+            if speech.size == 0:
+                if is_partial:
+                    print("Aucune parole détectée dans la fenêtre partielle, retour vide")
+                    return {"text": "", "segments": []}
+                error_msg = "Aucune parole détectée dans l'enregistrement. Vérifiez que le microphone fonctionne correctement."
+                print(f"ERREUR: {error_msg}")
+                raise ValueError(error_msg)
+            print(f"VAD: {pcm_duration(speech):.1f}s de parole conservées sur {audio_duration:.1f}s")
+            audio = speech
+            
             try:
                 # Transcrire avec Whisper avec des paramètres optimisés pour la vitesse
-                print(f"Transcription Whisper du fichier WAV (langue: {language or 'auto'})...")
-                result_text = self.model.transcribe(
-                    wav_path, 
+                print(f"Transcription Whisper de l'audio décodé (langue: {language or 'auto'})...")
+                result_text = self.engine.transcribe(
+                    audio, 
                     language=language,  # "fr", "en", ou None pour auto-détection
                     verbose=True,
                     task="transcribe",  # Forcer la transcription (pas la traduction)
@@ -249,12 +292,14 @@ class WhisperService:
                     print("ATTENTION: Transcription vide!")
                     # Essayer sans spécifier la langue avec paramètres par défaut
                     print("Tentative sans spécifier la langue...")
-                    result_text = self.model.transcribe(wav_path, verbose=True)
+                    result_text = self.engine.transcribe(audio, verbose=True)
                     text = result_text["text"].strip()
                     print(f"Transcription sans langue: {len(text)} caractères")
                     if text:
                         print(f"Texte: '{text[:100]}...'")
-                return text
+                # Timestamps replacés dans l'audio d'origine (les silences retirés par la VAD)
+                segments = [_segment(segment, regions) for segment in result_text.get("segments", [])]
+                return {"text": text, "segments": [segment for segment in segments if segment["text"]]}
             except RuntimeError as e:
                 error_str = str(e)
                 # Détecter spécifiquement l'erreur de tensor
@@ -262,7 +307,7 @@ class WhisperService:
                     # Pour les transcriptions partielles, on retourne simplement une chaîne vide
                     if is_partial:
                         print(f"ERREUR TENSOR lors de transcription partielle (audio trop court), retour vide")
-                        return ""
+                        return {"text": "", "segments": []}
                     else:
                         error_msg = "L'audio enregistré est trop court ou silencieux pour être transcrit. Veuillez enregistrer au moins 1 seconde d'audio avec du son audible."
                         print(f"ERREUR TENSOR: {error_msg}")
@@ -272,10 +317,6 @@ class WhisperService:
                     error_msg = f"Erreur lors du traitement de l'audio: {error_str}"
                     print(f"ERREUR RUNTIME: {error_msg}")
                     raise ValueError(error_msg) from e
-            finally:
-                # Nettoyer le fichier WAV
-                if os.path.exists(wav_path):
-                    os.unlink(wav_path)
         except ValueError:
             # Re-lancer les ValueError telles quelles (messages d'erreur user-friendly)
             raise
@@ -286,7 +327,7 @@ class WhisperService:
                 # Pour les transcriptions partielles, on retourne simplement une chaîne vide
                 if is_partial:
                     print(f"ERREUR TENSOR lors de transcription partielle (audio trop court), retour vide")
-                    return ""
+                    return {"text": "", "segments": []}
                 else:
                     error_msg = "L'audio enregistré est trop court ou silencieux pour être transcrit. Veuillez enregistrer au moins 1 seconde d'audio avec du son audible."
                     print(f"ERREUR TENSOR: {error_msg}")
@@ -296,80 +337,53 @@ class WhisperService:
                 import traceback
                 traceback.print_exc()
                 raise
-        finally:
-            # Nettoyer le fichier webm
-            if os.path.exists(webm_path):
-                os.unlink(webm_path)
     
-    def get_audio_duration(self, audio_path: str) -> float:
+    def transcribe_window(self, pcm: np.ndarray, language: str = None, prompt: str = None) -> list[dict]:
         """
-        Obtient la durée d'un fichier audio en secondes via ffprobe
-        
+        Transcrit une fenêtre PCM courte (transcriptions partielles incrémentales)
+
         Args:
-            audio_path: Chemin vers le fichier audio
-        
+            pcm: Échantillons float32 mono 16 kHz
+            language: Code langue ("fr", "en" ou None pour auto-détection)
+            prompt: Texte déjà validé, fourni comme contexte au décodeur
+
         Returns:
-            Durée en secondes, ou 0.0 si la durée ne peut pas être déterminée
+            Liste de segments {"start", "end", "text", "confidence", ...} relatifs au début de la fenêtre
         """
+        self.load_model()
         try:
-            result = subprocess.run(
-                [
-                    "ffprobe",
-                    "-v", "error",
-                    "-show_entries", "format=duration",
-                    "-of", "default=noprint_wrappers=1:nokey=1",
-                    audio_path,
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
+            result = self.engine.transcribe(
+                pcm,
+                language=language,
+                task="transcribe",
+                temperature=0.0,
+                best_of=1,
+                beam_size=3,
+                initial_prompt=prompt,
+                condition_on_previous_text=False,  # Fenêtre courte, pas besoin de contexte glissant
             )
-            duration = float(result.stdout.strip())
-            return duration
-        except (subprocess.CalledProcessError, ValueError, FileNotFoundError) as e:
-            print(f"Impossible de déterminer la durée de l'audio: {e}")
-            return 0.0
+        except RuntimeError as e:
+            # Fenêtre trop courte ou silencieuse (erreur de tensor), pas de texte partiel
+            print(f"Transcription de fenêtre impossible: {e}")
+            return []
+        return [_segment(s) for s in result.get("segments", [])]
 
-    def convert_webm_to_wav_from_file(self, webm_path: str) -> bytes:
+    def transcribe_windows(self, windows: list[np.ndarray], language: str = None) -> list[list[dict]]:
         """
-        Convertit un fichier webm en WAV PCM via ffmpeg
-        
+        Transcrit en un seul lot des fenêtres PCM courtes provenant de plusieurs sessions
+
         Args:
-            webm_path: Chemin vers le fichier webm
-        
+            windows: Fenêtres float32 mono 16 kHz (≤ 30 s chacune)
+            language: Code langue commun au lot ("fr", "en" ou None pour auto-détection)
+
         Returns:
-            Données audio au format WAV PCM
+            Pour chaque fenêtre, la liste de ses segments {"start", "end", "text", "confidence", ...}
         """
-        # Créer un fichier temporaire pour l'output
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as output_file:
-            output_path = output_file.name
-
+        self.load_model()
         try:
-            # Utiliser ffmpeg pour convertir
-            result = subprocess.run(
-                [
-                    "ffmpeg",
-                    "-i",
-                    webm_path,
-                    "-ar",
-                    "16000",  # Sample rate 16kHz (requis par Whisper)
-                    "-ac",
-                    "1",  # Mono
-                    "-f",
-                    "wav",
-                    "-y",  # Overwrite output file
-                    output_path,
-                ],
-                check=True,
-                capture_output=True,
-            )
-
-            # Lire le fichier WAV converti
-            with open(output_path, "rb") as f:
-                wav_data = f.read()
-
-            return wav_data
-        finally:
-            # Nettoyer le fichier de sortie
-            if os.path.exists(output_path):
-                os.unlink(output_path)
+            results = self.engine.transcribe_batch(windows, language=language, beam_size=3)
+            return [[_segment(s) for s in segments] for segments in results]
+        except RuntimeError as e:
+            # Un lot échoue en bloc (fenêtre vide...) : retenter fenêtre par fenêtre
+            print(f"Transcription par lot impossible, repli fenêtre par fenêtre: {e}")
+            return [self.transcribe_window(window, language) for window in windows]
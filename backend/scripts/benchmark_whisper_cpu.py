@@ -0,0 +1,63 @@
+"""
+Benchmark du mode d'optimisation CPU de Whisper (quantification int8 + threads torch)
+
+Compare la latence de transcription du modèle FP32 par défaut et du modèle optimisé,
+en simulant le nombre de transcriptions simultanées du backend.
+
+Usage (depuis le répertoire backend) :
+    python -m scripts.benchmark_whisper_cpu enregistrement.webm --model small --runs 3
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.asr_engines import create_engine
+from app.services.audio_decoder import decode_audio, pcm_duration
+
+
+def run_benchmark(engine, audio, language: str, runs: int, concurrent_jobs: int) -> float:
+    """Retourne la latence moyenne (secondes) d'une transcription sous charge concurrente"""
+    def transcribe_once(_):
+        start = time.perf_counter()
+        engine.transcribe(audio, language=language, temperature=0.0, best_of=1, beam_size=3)
+        return time.perf_counter() - start
+
+    # Premier passage hors mesure (initialisation des kernels)
+    transcribe_once(None)
+    latencies = []
+    with ThreadPoolExecutor(max_workers=concurrent_jobs) as executor:
+        for _ in range(runs):
+            latencies.extend(executor.map(transcribe_once, range(concurrent_jobs)))
+    return sum(latencies) / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("audio", help="Fichier audio à transcrire (webm, wav, mp3...)")
+    parser.add_argument("--model", default="small", help="Taille du modèle Whisper")
+    parser.add_argument("--language", default="fr")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=2, help="Transcriptions simultanées")
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as f:
+        audio = decode_audio(f.read())
+    print(f"Audio: {pcm_duration(audio):.1f}s, modèle {args.model}, {args.jobs} transcriptions simultanées")
+
+    results = {}
+    for label, optimize in (("FP32 (défaut)", False), ("int8 + threads", True)):
+        engine = create_engine(
+            args.model, "cpu", name="openai-whisper", concurrent_jobs=args.jobs, cpu_optimize=optimize
+        )
+        load_start = time.perf_counter()
+        engine.load()
+        print(f"[{label}] chargement: {time.perf_counter() - load_start:.1f}s")
+        results[label] = run_benchmark(engine, audio, args.language, args.runs, args.jobs)
+        print(f"[{label}] latence moyenne: {results[label]:.2f}s")
+
+    baseline, optimized = results.values()
+    print(f"Gain de latence: x{baseline / optimized:.2f} ({(1 - optimized / baseline) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
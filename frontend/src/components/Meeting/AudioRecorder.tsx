@@ -1,4 +1,8 @@
 import { useState, useRef, useEffect } from 'react'
+import { TranscriptSegment } from '../../types'
+
+// Tentatives de reconnexion à la session après une coupure réseau
+const MAX_RECONNECT_ATTEMPTS = 5
 
 interface AudioRecorderProps {
   isRecording: boolean
@@ -22,62 +26,28 @@ function AudioRecorder({
   onTranscribingChange,
 }: AudioRecorderProps) {
   const [error, setError] = useState<string | null>(null)
+  const [modelLoading, setModelLoading] = useState(false)
+  const [reconnecting, setReconnecting] = useState(false)
   const mediaRecorderRef = useRef<MediaRecorder | null>(null)
   const websocketRef = useRef<WebSocket | null>(null)
   const streamRef = useRef<MediaStream | null>(null)
-  const accumulatedTranscriptionRef = useRef<string>('')
-
-  // Fonction pour détecter et supprimer les chevauchements de texte
-  const mergeTranscription = (current: string, newText: string): string => {
-    if (!current || !current.trim()) {
-      return newText.trim()
-    }
-
-    const currentTrimmed = current.trim()
-    const newTrimmed = newText.trim()
-
-    // Si le nouveau texte est déjà complètement contenu dans le texte actuel, ne rien ajouter
-    if (currentTrimmed.includes(newTrimmed)) {
-      return currentTrimmed
-    }
+  const stableTextRef = useRef<string>('')
+  const tentativeTextRef = useRef<string>('')
+  const chunksRef = useRef<Blob[]>([])
+  const sessionIdRef = useRef<string | null>(null)
+  const stopRequestedRef = useRef(false)
+  const reconnectAttemptsRef = useRef(0)
+  // Le serveur est synchronisé avec l'audio envoyé (après une reconnexion : une fois le
+  // message session reçu et l'audio manquant renvoyé)
+  const liveRef = useRef(false)
 
-    // Détecter le chevauchement en comparant les derniers mots du texte actuel
-    // avec les premiers mots du nouveau texte
-    const currentWords = currentTrimmed.split(/\s+/)
-    const newWords = newTrimmed.split(/\s+/)
-
-    // Chercher un chevauchement en comparant de 1 à min(10, longueur) mots
-    let overlapLength = 0
-    const maxOverlap = Math.min(10, Math.min(currentWords.length, newWords.length))
-
-    for (let i = 1; i <= maxOverlap; i++) {
-      const currentEnd = currentWords.slice(-i).join(' ').toLowerCase()
-      const newStart = newWords.slice(0, i).join(' ').toLowerCase()
-
-      if (currentEnd === newStart) {
-        overlapLength = i
-      }
-    }
-
-    // Si on a trouvé un chevauchement, ne garder que la partie non dupliquée
-    if (overlapLength > 0) {
-      const nonOverlappingWords = newWords.slice(overlapLength)
-      if (nonOverlappingWords.length > 0) {
-        // Ajouter un espace si nécessaire
-        const separator = currentTrimmed.endsWith(' ') || currentTrimmed.endsWith('.') || 
-                         currentTrimmed.endsWith('!') || currentTrimmed.endsWith('?') ? '' : ' '
-        return currentTrimmed + separator + nonOverlappingWords.join(' ')
-      }
-      // Si tout le nouveau texte est déjà dans l'ancien, retourner l'ancien
-      return currentTrimmed
-    }
-
-    // Pas de chevauchement détecté, ajouter le nouveau texte avec un espace
-    const separator = currentTrimmed.endsWith(' ') || currentTrimmed.endsWith('.') || 
-                     currentTrimmed.endsWith('!') || currentTrimmed.endsWith('?') ? '' : ' '
-    return currentTrimmed + separator + newTrimmed
+  // Transcription en direct : segments validés (ajoutés au fil des deltas) et fin provisoire
+  const showTranscription = () => {
+    onTranscriptionUpdate([stableTextRef.current, tentativeTextRef.current].filter(Boolean).join(' '))
   }
 
+  const joinSegments = (segments: TranscriptSegment[]) => segments.map((s) => s.text).join(' ')
+
   const startRecording = async () => {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true })
@@ -90,146 +60,238 @@ function AudioRecorder({
         mimeType: 'audio/webm;codecs=opus',
       })
       mediaRecorderRef.current = mediaRecorder
+      chunksRef.current = []
+      sessionIdRef.current = null
+      stopRequestedRef.current = false
+      reconnectAttemptsRef.current = 0
+      stableTextRef.current = '' // Réinitialiser la transcription accumulée
+      tentativeTextRef.current = ''
+      onTranscriptionUpdate('') // Réinitialiser la transcription dans l'UI
 
-      // Utiliser une URL relative pour fonctionner avec le proxy Nginx en Docker
-      // En développement: ws://localhost:5173/ws/transcribe (proxied par Vite)
-      // En production Docker: ws://localhost/ws/transcribe (proxied par Nginx)
-      const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
-      const wsHost = window.location.host
-      const ws = new WebSocket(`${wsProtocol}//${wsHost}/ws/transcribe`)
-      websocketRef.current = ws
-
-      // Utiliser un timeout pour détecter les vraies erreurs de connexion
-      let connectionTimeout: ReturnType<typeof setTimeout> | null = null
-      let connectionEstablished = false
+      mediaRecorder.ondataavailable = (event) => {
+        if (event.data.size > 0) {
+          // Chunks conservés pour les renvoyer après une reconnexion
+          chunksRef.current.push(event.data)
+          const ws = websocketRef.current
+          if (ws && ws.readyState === WebSocket.OPEN && liveRef.current) {
+            ws.send(event.data)
+          }
+        }
+      }
 
-      ws.onopen = () => {
-        connectionEstablished = true
-        if (connectionTimeout) {
-          clearTimeout(connectionTimeout)
-          connectionTimeout = null
+      mediaRecorder.onstop = () => {
+        stopRequestedRef.current = true
+        const ws = websocketRef.current
+        // Indiquer que la transcription est en cours
+        if (onTranscribingChange) {
+          onTranscribingChange(true)
+        }
+        if (ws && ws.readyState === WebSocket.OPEN && liveRef.current) {
+          ws.send(JSON.stringify({ type: 'stop' }))
+          // Ne pas fermer le WebSocket ici, attendre la transcription finale
+          // Le WebSocket sera fermé automatiquement quand on reçoit le message final
         }
-        // Envoyer la langue sélectionnée
-        ws.send(JSON.stringify({ language }))
+        // Sinon l'arrêt est envoyé après la reconnexion, à la suite de l'audio manquant
+      }
+
+      connect(mediaRecorder)
+    } catch (err) {
+      console.error('Error starting recording:', err)
+      setError('Impossible d\'accéder au microphone')
+    }
+  }
+
+  // Renvoie l'audio que le serveur n'a pas reçu avant la coupure (à partir de receivedBytes)
+  const resendChunks = (ws: WebSocket, receivedBytes: number) => {
+    let offset = 0
+    for (const chunk of chunksRef.current) {
+      const end = offset + chunk.size
+      if (end > receivedBytes) {
+        ws.send(offset >= receivedBytes ? chunk : chunk.slice(receivedBytes - offset))
+      }
+      offset = end
+    }
+  }
+
+  const connect = (mediaRecorder: MediaRecorder) => {
+    // Utiliser une URL relative pour fonctionner avec le proxy Nginx en Docker
+    // En développement: ws://localhost:5173/ws/transcribe (proxied par Vite)
+    // En production Docker: ws://localhost/ws/transcribe (proxied par Nginx)
+    const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+    const wsHost = window.location.host
+    const isReconnect = sessionIdRef.current !== null
+    // Reconnexion : le serveur reprend la session là où elle s'est arrêtée
+    const query = isReconnect ? `?session_id=${sessionIdRef.current}` : ''
+    const ws = new WebSocket(`${wsProtocol}//${wsHost}/ws/transcribe${query}`)
+    websocketRef.current = ws
+    liveRef.current = false
+    let finished = false
+
+    // Utiliser un timeout pour détecter les vraies erreurs de connexion
+    let connectionTimeout: ReturnType<typeof setTimeout> | null = null
+    let connectionEstablished = false
+
+    ws.onopen = () => {
+      connectionEstablished = true
+      reconnectAttemptsRef.current = 0
+      if (connectionTimeout) {
+        clearTimeout(connectionTimeout)
+        connectionTimeout = null
+      }
+      setReconnecting(false)
+      // Envoyer la langue sélectionnée
+      ws.send(JSON.stringify({ language }))
+      if (!isReconnect) {
+        liveRef.current = true
         mediaRecorder.start(100) // Envoyer des chunks toutes les 100ms
         setIsRecording(true)
         setError(null)
-        accumulatedTranscriptionRef.current = '' // Réinitialiser la transcription accumulée
-        onTranscriptionUpdate('') // Réinitialiser la transcription dans l'UI
         onRecordingStart()
       }
+    }
 
-      // Détecter les vraies erreurs de connexion avec un délai
-      connectionTimeout = setTimeout(() => {
-        if (!connectionEstablished && ws.readyState !== WebSocket.OPEN) {
-          setError('Erreur de connexion WebSocket. Vérifiez que le serveur est démarré.')
-          setIsRecording(false)
-          if (streamRef.current) {
-            streamRef.current.getTracks().forEach((track) => track.stop())
-          }
+    // Détecter les vraies erreurs de connexion avec un délai
+    connectionTimeout = setTimeout(() => {
+      if (!connectionEstablished && ws.readyState !== WebSocket.OPEN && !isReconnect) {
+        setError('Erreur de connexion WebSocket. Vérifiez que le serveur est démarré.')
+        setIsRecording(false)
+        if (streamRef.current) {
+          streamRef.current.getTracks().forEach((track) => track.stop())
         }
-      }, 3000) // Attendre 3 secondes avant d'afficher l'erreur
+      }
+    }, 3000) // Attendre 3 secondes avant d'afficher l'erreur
 
-      ws.onmessage = (event) => {
-        try {
-          const data = JSON.parse(event.data)
-          console.log('Message WebSocket reçu:', data)
-          if (data.type === 'partial') {
-            // Accumuler les transcriptions partielles avec détection de chevauchement
-            const newText = data.text.trim()
-            console.log('Transcription partielle reçue:', newText)
-            if (newText) {
-              const current = accumulatedTranscriptionRef.current
-              // Utiliser la fonction de fusion intelligente pour éviter les doublons
-              accumulatedTranscriptionRef.current = mergeTranscription(current, newText)
-              console.log('Transcription accumulée mise à jour:', accumulatedTranscriptionRef.current)
-              
-              // Toujours mettre à jour la transcription en temps réel
-              onTranscriptionUpdate(accumulatedTranscriptionRef.current)
-            }
-          } else if (data.type === 'final') {
-            console.log('Transcription finale reçue:', data.text)
-            // La transcription finale remplace tout
-            onTranscriptionUpdate(data.text)
-            accumulatedTranscriptionRef.current = data.text
-            onRecordingStop()
-            // Indiquer que la transcription est terminée
-            if (onTranscribingChange) {
-              onTranscribingChange(false)
+    ws.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data)
+        console.log('Message WebSocket reçu:', data)
+        if (data.type === 'session') {
+          sessionIdRef.current = data.session_id
+          if (isReconnect) {
+            console.log(`Session reprise (${data.received_bytes} octets déjà reçus par le serveur)`)
+            // Les nouveaux chunks restent dans chunksRef jusqu'ici : l'audio manquant est
+            // renvoyé dans l'ordre, puis l'envoi en direct reprend
+            resendChunks(ws, data.received_bytes)
+            liveRef.current = true
+            if (!data.replayed) {
+              // Segments déjà transcrits par le serveur : les deltas suivants partent de cet état
+              stableTextRef.current = joinSegments(data.stable)
+              tentativeTextRef.current = joinSegments(data.tentative)
+            } else if (data.stable.length === 0 && data.tentative.length === 0) {
+              // Session reprise depuis le disque : le serveur ne connaît plus le texte déjà
+              // affiché, qui est conservé ; les nouveaux segments s'y ajoutent
+              stableTextRef.current = [stableTextRef.current, tentativeTextRef.current].filter(Boolean).join(' ')
+              tentativeTextRef.current = ''
+            } else {
+              tentativeTextRef.current = joinSegments(data.tentative)
             }
-            // Fermer le WebSocket après avoir reçu la transcription finale
-            if (ws.readyState === WebSocket.OPEN) {
-              ws.close()
-            }
-          } else if (data.type === 'error') {
-            console.error('Erreur transcription:', data.message)
-            setError(data.message || 'Erreur lors de la transcription')
-            // Arrêter l'enregistrement et fermer le stream
-            setIsRecording(false)
-            onRecordingStop()
-            // Indiquer que la transcription est terminée (avec erreur)
-            if (onTranscribingChange) {
-              onTranscribingChange(false)
-            }
-            if (mediaRecorderRef.current && mediaRecorderRef.current.state !== 'inactive') {
-              mediaRecorderRef.current.stop()
-            }
-            if (streamRef.current) {
-              streamRef.current.getTracks().forEach((track) => track.stop())
-            }
-            if (ws.readyState === WebSocket.OPEN) {
-              ws.close()
+            showTranscription()
+            if (stopRequestedRef.current) {
+              ws.send(JSON.stringify({ type: 'stop' }))
             }
           }
-        } catch (err) {
-          console.error('Erreur parsing message WebSocket:', err)
-        }
-      }
-
-      ws.onerror = (error) => {
-        console.error('WebSocket error:', error)
-        // Ne pas afficher l'erreur immédiatement, attendre le timeout
-        // ou vérifier si la connexion est vraiment fermée
-        if (ws.readyState === WebSocket.CLOSED && !connectionEstablished) {
-          setError('Erreur de connexion WebSocket. Vérifiez que le serveur est démarré.')
+        } else if (data.type === 'status') {
+          // Modèle Whisper en cours de chargement côté serveur : l'audio est conservé,
+          // la transcription démarre dès qu'il est prêt
+          setModelLoading(data.status === 'loading')
+        } else if (data.type === 'delta') {
+          setModelLoading(false)
+          // Seuls les changements sont reçus : ajouter les nouveaux segments validés et
+          // remplacer la fin provisoire si elle a été révisée
+          const added = joinSegments(data.stable)
+          if (added) {
+            stableTextRef.current = [stableTextRef.current, added].filter(Boolean).join(' ')
+          }
+          if (data.tentative !== undefined) {
+            tentativeTextRef.current = joinSegments(data.tentative)
+          }
+          showTranscription()
+        } else if (data.type === 'final') {
+          finished = true
+          setModelLoading(false)
+          console.log('Transcription finale reçue:', data.text)
+          // La transcription finale remplace tout
+          onTranscriptionUpdate(data.text)
+          stableTextRef.current = data.text
+          tentativeTextRef.current = ''
+          chunksRef.current = []
+          onRecordingStop()
+          // Indiquer que la transcription est terminée
+          if (onTranscribingChange) {
+            onTranscribingChange(false)
+          }
+          // Fermer le WebSocket après avoir reçu la transcription finale
+          if (ws.readyState === WebSocket.OPEN) {
+            ws.close()
+          }
+        } else if (data.type === 'error') {
+          finished = true
+          setModelLoading(false)
+          console.error('Erreur transcription:', data.message)
+          setError(data.message || 'Erreur lors de la transcription')
+          chunksRef.current = []
+          // Arrêter l'enregistrement et fermer le stream
           setIsRecording(false)
+          onRecordingStop()
+          // Indiquer que la transcription est terminée (avec erreur)
+          if (onTranscribingChange) {
+            onTranscribingChange(false)
+          }
+          if (mediaRecorderRef.current && mediaRecorderRef.current.state !== 'inactive') {
+            mediaRecorderRef.current.stop()
+          }
           if (streamRef.current) {
             streamRef.current.getTracks().forEach((track) => track.stop())
           }
+          if (ws.readyState === WebSocket.OPEN) {
+            ws.close()
+          }
         }
+      } catch (err) {
+        console.error('Erreur parsing message WebSocket:', err)
       }
+    }
 
-      ws.onclose = (event) => {
-        if (connectionTimeout) {
-          clearTimeout(connectionTimeout)
-          connectionTimeout = null
-        }
-        // Ne pas afficher d'erreur si la fermeture est normale (code 1000)
-        if (event.code !== 1000 && event.code !== 1001 && !connectionEstablished) {
-          setError('Connexion WebSocket fermée. Réessayez.')
+    ws.onerror = (error) => {
+      console.error('WebSocket error:', error)
+      // Ne pas afficher l'erreur immédiatement, attendre le timeout
+      // ou vérifier si la connexion est vraiment fermée
+      if (ws.readyState === WebSocket.CLOSED && !connectionEstablished && !isReconnect) {
+        setError('Erreur de connexion WebSocket. Vérifiez que le serveur est démarré.')
+        setIsRecording(false)
+        if (streamRef.current) {
+          streamRef.current.getTracks().forEach((track) => track.stop())
         }
       }
+    }
 
-      mediaRecorder.ondataavailable = (event) => {
-        if (event.data.size > 0 && ws.readyState === WebSocket.OPEN) {
-          ws.send(event.data)
-        }
+    ws.onclose = (event) => {
+      if (connectionTimeout) {
+        clearTimeout(connectionTimeout)
+        connectionTimeout = null
       }
-
-      mediaRecorder.onstop = () => {
-        if (ws.readyState === WebSocket.OPEN) {
-          ws.send(JSON.stringify({ type: 'stop' }))
-          // Indiquer que la transcription est en cours
-          if (onTranscribingChange) {
-            onTranscribingChange(true)
-          }
-          // Ne pas fermer le WebSocket ici, attendre la transcription finale
-          // Le WebSocket sera fermé automatiquement quand on reçoit le message final
+      // Coupure pendant la session (enregistrement ou attente de la finale) : se reconnecter
+      // à la même session, l'audio manquant est renvoyé
+      if (!finished && sessionIdRef.current && websocketRef.current === ws) {
+        if (reconnectAttemptsRef.current < MAX_RECONNECT_ATTEMPTS) {
+          reconnectAttemptsRef.current += 1
+          setReconnecting(true)
+          const delay = Math.min(1000 * 2 ** (reconnectAttemptsRef.current - 1), 10000)
+          console.log(`Connexion perdue, reconnexion dans ${delay}ms...`)
+          setTimeout(() => connect(mediaRecorder), delay)
+          return
         }
+        setReconnecting(false)
+        setError('Connexion au serveur perdue. La transcription n\'a pas pu être terminée.')
+        if (onTranscribingChange) {
+          onTranscribingChange(false)
+        }
+        return
+      }
+      // Ne pas afficher d'erreur si la fermeture est normale (code 1000)
+      if (event.code !== 1000 && event.code !== 1001 && !connectionEstablished && !isReconnect) {
+        setError('Connexion WebSocket fermée. Réessayez.')
       }
-    } catch (err) {
-      console.error('Error starting recording:', err)
-      setError('Impossible d\'accéder au microphone')
     }
   }
 
@@ -250,7 +312,9 @@ function AudioRecorder({
   useEffect(() => {
     return () => {
       if (websocketRef.current) {
-        websocketRef.current.close()
+        const ws = websocketRef.current
+        websocketRef.current = null // Fermeture volontaire : pas de reconnexion
+        ws.close()
       }
       if (streamRef.current) {
         streamRef.current.getTracks().forEach((track) => track.stop())
@@ -261,6 +325,12 @@ function AudioRecorder({
   return (
     <div className="audio-recorder">
       {error && <div className="error">{error}</div>}
+      {reconnecting && (
+        <div className="info">Connexion perdue, reconnexion en cours... L'audio est conservé.</div>
+      )}
+      {modelLoading && (
+        <div className="info">Chargement du modèle de transcription... L'enregistrement continue.</div>
+      )}
       {!isRecording ? (
         <button onClick={startRecording} className="btn btn-primary">
           Start Recording
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import { getPrompts, generateSummary, getModels } from '../../services/api'
+import { getPrompts, generateSummaryStream, getModels } from '../../services/api'
 import { Prompt, ModelsResponse } from '../../types'
 import SummaryActions from './SummaryActions'
 
@@ -11,6 +11,7 @@ function SummaryGenerator({ transcription }: SummaryGeneratorProps) {
   const [prompts, setPrompts] = useState<Prompt[]>([])
   const [selectedPromptId, setSelectedPromptId] = useState<number | null>(null)
   const [availableModels, setAvailableModels] = useState<string[]>([])
+  const [modelStates, setModelStates] = useState<Record<string, string>>({})
   const [defaultModel, setDefaultModel] = useState<string>('llama3.2:3b')
   const [provider, setProvider] = useState<string>('ollama')
   const [selectedModel, setSelectedModel] = useState<string>('')
@@ -58,6 +59,7 @@ function SummaryGenerator({ transcription }: SummaryGeneratorProps) {
     try {
       const modelsData: ModelsResponse = await getModels()
       setAvailableModels(modelsData.models)
+      setModelStates(modelsData.model_states || {})
       setProvider(modelsData.provider)
       if (modelsData.default_model) {
         setDefaultModel(modelsData.default_model)
@@ -80,16 +82,30 @@ function SummaryGenerator({ transcription }: SummaryGeneratorProps) {
 
     setLoading(true)
     setError(null)
+    setSummary('')
+    setEditedSummary('')
+    setIsEdited(false)
 
     try {
-      const result = await generateSummary({
-        transcription,
-        prompt_id: selectedPromptId,
-        model: selectedModel,
-      })
-      setSummary(result.summary)
-      setEditedSummary(result.summary)
-      setIsEdited(false)
+      // Le compte rendu s'affiche au fil de la génération
+      let streamed = ''
+      const metrics = await generateSummaryStream(
+        {
+          transcription,
+          prompt_id: selectedPromptId,
+          model: selectedModel,
+        },
+        (text) => {
+          streamed += text
+          setSummary(streamed)
+          setEditedSummary(streamed)
+        }
+      )
+      if (metrics.cached) {
+        console.log('Compte rendu servi depuis le cache')
+      } else {
+        console.log(`Premier token en ${metrics.ttft_ms} ms, génération en ${metrics.total_ms} ms`)
+      }
     } catch (err) {
       console.error('Error generating summary:', err)
       setError('Erreur lors de la génération du compte rendu')
@@ -139,6 +155,7 @@ function SummaryGenerator({ transcription }: SummaryGeneratorProps) {
             availableModels.map((model) => (
               <option key={model} value={model}>
                 {model}
+                {modelStates[model] && modelStates[model] !== 'warm' ? ' (chargement en mémoire...)' : ''}
               </option>
             ))
           )}
@@ -167,6 +184,7 @@ function SummaryGenerator({ transcription }: SummaryGeneratorProps) {
               className="summary-content-editable"
               value={editedSummary}
               onChange={handleSummaryChange}
+              readOnly={loading}
               placeholder="Le compte rendu généré apparaîtra ici. Vous pouvez l'éditer avant de l'exporter."
               rows={15}
             />
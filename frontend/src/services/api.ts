@@ -1,4 +1,10 @@
-import { Prompt, GenerateSummaryRequest, GenerateSummaryResponse, ModelsResponse } from '../types'
+import {
+  Prompt,
+  GenerateSummaryRequest,
+  GenerateSummaryResponse,
+  ModelsResponse,
+  SummaryStreamMetrics,
+} from '../types'
 
 // Utiliser une URL relative pour fonctionner avec le proxy Nginx en Docker
 // En développement local, Vite proxy redirige /api vers localhost:8000
@@ -109,3 +115,69 @@ export async function generateSummary(
     throw error;
   }
 }
+
+export async function generateSummaryStream(
+  request: GenerateSummaryRequest,
+  onDelta: (text: string) => void
+): Promise<SummaryStreamMetrics> {
+  // Même timeout que generateSummary, mais le texte s'affiche dès le premier token
+  const controller = new AbortController();
+  const timeoutId = setTimeout(() => controller.abort(), 300000); // 5 minutes
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/generate-summary/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+      signal: controller.signal,
+    })
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }))
+      throw new Error(error.detail || 'Failed to generate summary')
+    }
+
+    // Lecture du flux Server-Sent Events (événements séparés par une ligne vide)
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let separator = buffer.indexOf('\n\n')
+      while (separator !== -1) {
+        const rawEvent = buffer.slice(0, separator)
+        buffer = buffer.slice(separator + 2)
+        separator = buffer.indexOf('\n\n')
+
+        let event = 'message'
+        let data = ''
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+        if (!data) continue
+        const payload = JSON.parse(data)
+        if (event === 'delta') {
+          onDelta(payload.text)
+        } else if (event === 'done') {
+          return payload as SummaryStreamMetrics
+        } else if (event === 'error') {
+          throw new Error(payload.detail || 'Failed to generate summary')
+        }
+      }
+    }
+    throw new Error('Flux de génération interrompu')
+  } catch (error) {
+    if (error instanceof Error && error.name === 'AbortError') {
+      throw new Error('La génération du compte rendu prend trop de temps. Veuillez réessayer avec une transcription plus courte ou un modèle plus rapide.')
+    }
+    throw error;
+  } finally {
+    clearTimeout(timeoutId);
+  }
+}
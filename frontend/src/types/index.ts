@@ -10,19 +10,41 @@ export interface GenerateSummaryRequest {
   transcription: string
   prompt_id: number
   model?: string
+  regenerate?: boolean
 }
 
 export interface GenerateSummaryResponse {
   summary: string
 }
 
+export interface SummaryStreamMetrics {
+  model: string
+  ttft_ms: number
+  total_ms: number
+  characters: number
+  cached: boolean
+}
+
 export interface ModelsResponse {
   provider: string
   models: string[]
   default_model: string
+  model_states?: Record<string, string>
 }
 
-export interface TranscriptionMessage {
-  type: 'partial' | 'final'
+export interface TranscriptSegment {
+  id: number
+  start: number // Secondes depuis le début de la session
+  end: number
   text: string
+  confidence?: number // Probabilité moyenne des tokens (0-1)
+  no_speech_prob?: number
+}
+
+export interface TranscriptionMessage {
+  type: 'delta' | 'final'
+  text?: string
+  stable?: TranscriptSegment[] // delta : nouveaux segments validés, à ajouter
+  tentative?: TranscriptSegment[] // delta : fin provisoire, absente si inchangée
+  segments?: TranscriptSegment[] // final : tous les segments de la transcription
 }